@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .models import VendorDailyStat
+
+# Vendor analytics page (VendorAnalyticsView).
+#
+# Everything comes from the vendor's VendorDailyStat rollups (core/rollups.py) for the window:
+# one query for at most a few rows per day, then NumPy turns (day offset, value, count) arrays
+# into the bookings-per-day series, the party size histogram and percentiles, the hourly
+# profile and the monthly rating trend. No Booking or Review rows are read.
+
+PEAK_HOURS = 3
+
+
+def weighted_percentile(values, weights, q):
+    """The smallest value with at least q% of the total weight at or below it."""
+    order = np.argsort(values, kind='stable')
+    cumulative = np.cumsum(weights[order])
+    return values[order][np.searchsorted(cumulative, q / 100 * cumulative[-1])]
+
+
+def _months(start, end):
+    """First days of the months from `start`'s to `end`'s."""
+    months = []
+    month = start.replace(day=1)
+    while month <= end:
+        months.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    return months
+
+
+def _arrays(entries, numeric=True):
+    """(day offsets, values, counts) arrays for [(offset, value, count), ...]."""
+    offsets, values, counts = zip(*entries) if entries else ((), (), ())
+    return (np.array(offsets, dtype=np.int64),
+            np.array([int(v) for v in values], dtype=np.int64) if numeric else np.array(values, dtype=object),
+            np.array(counts, dtype=np.int64))
+
+
+def vendor_analytics(vendor, days=None, end=None):
+    days = days or getattr(settings, 'VENDOR_ANALYTICS_DAYS', 365)
+    end = end or timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    series = {'bookings': [], 'party': [], 'hour': [], 'rating': []}
+    for day, metric, count in (VendorDailyStat.objects.filter(vendor=vendor, day__range=(start, end))
+                               .exclude(count=0).values_list('day', 'metric', 'count')):
+        kind, _, value = metric.partition(':')
+        if kind in series:
+            series[kind].append(((day - start).days, value, count))
+
+    offsets, statuses, counts = _arrays(series['bookings'], numeric=False)
+    per_day = np.bincount(offsets, weights=counts, minlength=days).astype(np.int64)
+    status_totals = {status: int(counts[statuses == status].sum()) for status in set(statuses)}
+    decided = status_totals.get('confirmed', 0) + status_totals.get('declined', 0)
+
+    _, sizes, counts = _arrays(series['party'])
+    party_counts = np.bincount(sizes, weights=counts).astype(np.int64)
+    party_median = int(weighted_percentile(sizes, counts, 50)) if len(sizes) else None
+    party_p90 = int(weighted_percentile(sizes, counts, 90)) if len(sizes) else None
+
+    _, hours, counts = _arrays(series['hour'])
+    hour_counts = np.bincount(hours, weights=counts, minlength=24).astype(np.int64)
+    peak_hours = [int(h) for h in np.argsort(-hour_counts, kind='stable')[:PEAK_HOURS] if hour_counts[h]]
+
+    months = _months(start, end)
+    offsets, stars, counts = _arrays(series['rating'])
+    days_to_month = np.array([(d.year - start.year) * 12 + d.month - start.month
+                              for d in (start + timedelta(days=i) for i in range(days))], dtype=np.int64)
+    review_months = days_to_month[offsets]
+    review_counts = np.bincount(review_months, weights=counts, minlength=len(months))
+    star_sums = np.bincount(review_months, weights=stars * counts, minlength=len(months))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        monthly_rating = star_sums / review_counts
+
+    return {
+        'start': start,
+        'end': end,
+        'day_labels': [(start + timedelta(days=i)).isoformat() for i in range(days)],
+        'bookings_per_day': per_day.tolist(),
+        'total_bookings': int(per_day.sum()),
+        'status_totals': status_totals,
+        'confirmation_rate': status_totals.get('confirmed', 0) / decided if decided else None,
+        'party_sizes': np.flatnonzero(party_counts).tolist(),
+        'party_counts': party_counts[party_counts > 0].tolist(),
+        'party_median': party_median,
+        'party_p90': party_p90,
+        'hour_counts': hour_counts.tolist(),
+        'peak_hours': peak_hours,
+        'rating_months': [month.strftime('%b %Y') for month in months],
+        'monthly_rating': [None if np.isnan(r) else round(float(r), 2) for r in monthly_rating],
+        'review_count': int(review_counts.sum()),
+    }
@@ -0,0 +1,109 @@
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+
+from .models import FoodItem, VendorProfile
+from .search import tokenize
+
+# In-process prefix index for type-ahead suggestions.
+#
+# Every vendor name, cuisine and dish name is stored under each of its word-start suffixes
+# ("tonkotsu ramen" and "ramen") in one sorted list, so a lookup is a bisect plus a short scan.
+# Signals in this process apply changes incrementally; changes made by other worker processes
+# are picked up by a full rebuild once the index is older than AUTOCOMPLETE_MAX_AGE seconds.
+
+VENDOR, CUISINE, DISH = 'vendor', 'cuisine', 'dish'
+
+
+def _terms(text):
+    words = tokenize(text)
+    return [' '.join(words[i:]) for i in range(len(words))]
+
+
+class PrefixIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # One sorted list per kind of (term, label, ref_id, vendor_id for dishes), so a scan for
+        # one kind stops as soon as it has `limit` suggestions
+        self._entries = {VENDOR: [], CUISINE: [], DISH: []}
+        self._by_ref = {}  # (kind, ref_id) -> entries, for removal
+        self.built_at = None
+
+    @staticmethod
+    def _make(label, ref_id, extra=None):
+        return [(term, label, ref_id, extra) for term in _terms(label)]
+
+    def rebuild(self):
+        by_ref = {}
+        for value, label in VendorProfile.CUISINE_CHOICES:
+            by_ref[(CUISINE, value)] = self._make(label, value)
+        for pk, name in VendorProfile.objects.values_list('pk', 'business_name'):
+            by_ref[(VENDOR, pk)] = self._make(name, pk)
+        for pk, name, vendor_id in FoodItem.objects.values_list('pk', 'name', 'vendor_id'):
+            by_ref[(DISH, pk)] = self._make(name, pk, vendor_id)
+        entries = {VENDOR: [], CUISINE: [], DISH: []}
+        for (kind, _), ref_entries in by_ref.items():
+            entries[kind].extend(ref_entries)
+        for kind_entries in entries.values():
+            kind_entries.sort()
+        with self._lock:
+            self._entries, self._by_ref = entries, by_ref
+            self.built_at = time.monotonic()
+
+    def is_stale(self):
+        max_age = getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 300)
+        return self.built_at is None or time.monotonic() - self.built_at > max_age
+
+    def update(self, kind, ref_id, label=None, extra=None):
+        """Replace (or with label=None, drop) the entries of one vendor or dish."""
+        if self.built_at is None:
+            return  # Nothing loaded yet; the first lookup builds from the database
+        with self._lock:
+            # Copy-on-write: readers keep scanning the list they already hold
+            kind_entries = list(self._entries[kind])
+            for entry in self._by_ref.pop((kind, ref_id), []):
+                position = bisect_left(kind_entries, entry)
+                if position < len(kind_entries) and kind_entries[position] == entry:
+                    del kind_entries[position]
+            if label:
+                new_entries = self._make(label, ref_id, extra)
+                for entry in new_entries:
+                    insort(kind_entries, entry)
+                self._by_ref[(kind, ref_id)] = new_entries
+            self._entries = {**self._entries, kind: kind_entries}
+
+    def suggest(self, prefix, limit=5):
+        """Up to `limit` distinct vendors, cuisines and dish names with a word starting with `prefix`."""
+        prefix = ' '.join(tokenize(prefix))
+        results = {VENDOR: [], CUISINE: [], DISH: []}
+        if not prefix:
+            return results
+        for kind, bucket in results.items():
+            entries = self._entries[kind]
+            seen = set()
+            position = bisect_left(entries, (prefix,))
+            while len(bucket) < limit and position < len(entries) and entries[position][0].startswith(prefix):
+                _, label, ref_id, extra = entries[position]
+                position += 1
+                key = ref_id if kind == VENDOR else label.lower()  # one row per dish name
+                if key in seen:
+                    continue
+                seen.add(key)
+                if kind == VENDOR:
+                    bucket.append({'id': ref_id, 'name': label})
+                elif kind == DISH:
+                    bucket.append({'id': ref_id, 'name': label, 'vendor_id': extra})
+                else:
+                    bucket.append({'name': label})
+        return results
+
+
+index = PrefixIndex()
+
+
+def suggest(prefix, limit=5):
+    if index.is_stale():
+        index.rebuild()
+    return index.suggest(prefix, limit)
@@ -0,0 +1,133 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import reservations, rollups
+from .models import Booking, BookingRequest
+
+logger = logging.getLogger(__name__)
+
+# Asynchronous booking intake (BOOKING_ASYNC_INTAKE).
+#
+# BookingCreateView / TestBookingAPI validate the form and enqueue() a BookingRequest, answering
+# at once with its token; clients poll the request's status URL. `manage.py process_booking_queue`
+# workers claim queued requests in batches (SELECT ... FOR UPDATE SKIP LOCKED where supported, so
+# workers never wait on each other's batches), take seats per slot with one UPDATE per slot, insert
+# the accepted bookings with one bulk_create and record every outcome with one bulk_update.
+# A claim left 'processing' longer than BOOKING_QUEUE_CLAIM_TIMEOUT (a crashed worker) is retried.
+
+FINAL_STATUSES = ('accepted', 'rejected', 'failed')
+
+
+def enqueue(booking):
+    """Queue an unsaved, validated Booking. A repeated idempotency key returns the existing request."""
+    try:
+        with transaction.atomic():
+            return BookingRequest.objects.create(
+                tourist_id=booking.tourist_id, vendor_id=booking.vendor_id,
+                booking_date=booking.booking_date, booking_time=booking.booking_time,
+                number_of_people=booking.number_of_people, special_request=booking.special_request,
+                idempotency_key=booking.idempotency_key,
+            )
+    except IntegrityError:
+        existing = booking.idempotency_key and BookingRequest.objects.filter(
+            tourist_id=booking.tourist_id, idempotency_key=booking.idempotency_key
+        ).first()
+        if not existing:
+            raise
+        return existing
+
+
+def _booking_key(request):
+    # Bookings from the queue always get an idempotency key, so a retried batch cannot book twice
+    # and the bulk-inserted rows can be found again on databases that do not return their ids
+    return request.idempotency_key or f'q-{request.token.hex}'
+
+
+def claim(batch_size):
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, 'BOOKING_QUEUE_CLAIM_TIMEOUT', 300))
+    claimable = Q(status='queued') | Q(status='processing', claimed_at__lt=stale)
+    with transaction.atomic():
+        ids = list(
+            BookingRequest.objects.select_for_update(skip_locked=True).filter(claimable)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        BookingRequest.objects.filter(claimable, pk__in=ids).update(
+            status='processing', claimed_at=now, attempts=F('attempts') + 1
+        )
+    return list(
+        BookingRequest.objects.filter(pk__in=ids, status='processing', claimed_at=now)
+        .select_related('vendor').order_by('id')
+    )
+
+
+def _process(requests):
+    keys = {(r.tourist_id, _booking_key(r)) for r in requests}
+    # Keys already booked: synchronous bookings with the same key, or an earlier attempt
+    booked = {
+        (tourist_id, key): pk
+        for tourist_id, key, pk in Booking.objects.filter(idempotency_key__in={k for _, k in keys})
+        .values_list('tourist_id', 'idempotency_key', 'pk')
+    }
+    by_slot = defaultdict(list)
+    for request in requests:
+        if (request.tourist_id, _booking_key(request)) not in booked:
+            slot = (request.vendor_id, request.booking_date, reservations.slot_start(request.booking_time))
+            by_slot[slot].append(request)
+
+    now = timezone.now()
+    with transaction.atomic():
+        new_bookings = []
+        for slot in sorted(by_slot):  # same lock order in every worker
+            group = by_slot[slot]
+            left = reservations.hold_in_order(group[0].vendor, slot[1], slot[2], [r.number_of_people for r in group])
+            for request, remaining in zip(group, left):
+                if request.number_of_people <= remaining:
+                    new_bookings.append(Booking(
+                        tourist_id=request.tourist_id, vendor_id=request.vendor_id,
+                        booking_date=request.booking_date, booking_time=request.booking_time,
+                        number_of_people=request.number_of_people, special_request=request.special_request,
+                        idempotency_key=_booking_key(request),
+                    ))
+                else:
+                    request.status = 'rejected'
+                    request.error = f"Sorry, only {remaining} seats are left at that time."
+        Booking.objects.bulk_create(new_bookings, batch_size=500)
+        rollups.move_all([([], rollups.keys_of(booking)) for booking in new_bookings])  # bulk_create sends no signals
+        booked.update(
+            ((tourist_id, key), pk)
+            for tourist_id, key, pk in Booking.objects.filter(
+                idempotency_key__in=[b.idempotency_key for b in new_bookings]
+            ).values_list('tourist_id', 'idempotency_key', 'pk')
+        )
+        for request in requests:
+            booking_id = booked.get((request.tourist_id, _booking_key(request)))
+            if booking_id is not None:
+                request.status, request.booking_id = 'accepted', booking_id
+            request.processed_at = now
+        BookingRequest.objects.bulk_update(requests, ['status', 'booking', 'error', 'processed_at'], batch_size=500)
+
+
+def process_batch(batch_size=None):
+    """Claim up to `batch_size` queued requests and settle them; returns how many were claimed."""
+    requests = claim(batch_size or getattr(settings, 'BOOKING_QUEUE_BATCH_SIZE', 100))
+    if not requests:
+        return 0
+    try:
+        _process(requests)
+    except Exception:
+        logger.exception("Booking queue batch of %d requests failed", len(requests))
+        max_attempts = getattr(settings, 'BOOKING_QUEUE_MAX_ATTEMPTS', 3)
+        ids = [r.pk for r in requests]
+        BookingRequest.objects.filter(pk__in=ids, attempts__lt=max_attempts).update(status='queued', claimed_at=None)
+        BookingRequest.objects.filter(pk__in=ids, attempts__gte=max_attempts).update(
+            status='failed', error="Your booking could not be processed. Please try again.",
+            processed_at=timezone.now(),
+        )
+    return len(requests)
@@ -1,32 +1,73 @@
 import threading
 import requests
 import time
+import uuid
 
-URL = "http://127.0.0.1:8000/test-api/book/1/"  # Use your CSRF-exempt test endpoint
+URL = "http://127.0.0.1:8000/test-api/book/1/"  # CSRF-exempt test endpoint (runserver with DEBUG=True)
 TOTAL_USERS = 500
-success_count = 0
-fail_count = 0
+PEOPLE_PER_BOOKING = 2
+accepted_count = 0  # 200: booking saved, seats taken
+rejected_count = 0  # 409: slot full
+error_count = 0     # anything else (validation errors, server errors, connection failures)
+replayed_count = 0  # retries answered with the original booking (same Idempotency-Key)
 response_times = []
+acceptance_times = []  # submission to accepted booking, including time queued (async intake)
+queued_count = 0    # 202: queued for the process_booking_queue workers, polled until settled
+lock = threading.Lock()
+BASE_URL = "http://127.0.0.1:8000"
+POLL_INTERVAL = 0.2
+
+def wait_for_outcome(status_url):
+    """Poll a queued request until a worker settles it; returns the final status response."""
+    while True:
+        data = requests.get(BASE_URL + status_url).json()
+        if data["status"] not in ("queued", "processing"):
+            return data
+        time.sleep(POLL_INTERVAL)
 
 def make_booking():
-    global success_count, fail_count
+    global accepted_count, rejected_count, error_count, replayed_count, queued_count
+    key = uuid.uuid4().hex
     try:
         start = time.time()
-        response = requests.post(URL, json={
+        response = requests.post(URL, headers={"Idempotency-Key": key}, json={
             "booking_date": "2025-05-20",
             "booking_time": "18:00",
-            "number_of_people": 2,
+            "number_of_people": PEOPLE_PER_BOOKING,
             "special_request": "Stress test booking"
         })
         duration = time.time() - start
-        response_times.append(duration)
-
+        status_code = response.status_code
+        if status_code == 202:
+            with lock:
+                queued_count += 1
+            outcome = wait_for_outcome(response.json()["status_url"])
+            status_code = {"accepted": 200, "rejected": 409}.get(outcome["status"], 500)
+        if status_code == 200:
+            with lock:
+                acceptance_times.append(time.time() - start)
         if response.status_code == 200:
-            success_count += 1
-        else:
-            fail_count += 1
+            # Retry as a flaky mobile client would; must not create a second booking
+            retry = requests.post(URL, headers={"Idempotency-Key": key}, json={
+                "booking_date": "2025-05-20",
+                "booking_time": "18:00",
+                "number_of_people": PEOPLE_PER_BOOKING,
+            })
+            if retry.ok and retry.json().get("booking_id") == response.json()["booking_id"]:
+                with lock:
+                    replayed_count += 1
+        with lock:
+            response_times.append(duration)
+            if status_code == 200:
+                accepted_count += 1
+            elif status_code == 409:
+                rejected_count += 1
+            else:
+                error_count += 1
+                print(f"[ERROR] {response.status_code}: {response.text[:200]}")
     except Exception as e:
-        fail_count += 1
+        with lock:
+            error_count += 1
         print(f"[ERROR] {e}")
 
 threads = []
@@ -47,7 +88,17 @@ total_time = time.time() - start_time
 
 print(f"\n--- PT001 Stress Test Results ---")
 print(f"Total Requests: {TOTAL_USERS}")
-print(f"Successful: {success_count}")
-print(f"Failed: {fail_count}")
+print(f"Accepted: {accepted_count} ({accepted_count * PEOPLE_PER_BOOKING} seats)")
+print(f"Rejected (slot full): {rejected_count}")
+print(f"Errors: {error_count}")
+if queued_count:
+    print(f"Queued (async intake): {queued_count}")
+else:
+    print(f"Retries answered with the original booking: {replayed_count}/{accepted_count}")
 print(f"Total Test Duration: {total_time:.2f} seconds")
-print(f"Average Response Time: {sum(response_times)/len(response_times):.2f} seconds")
+if response_times:
+    print(f"Average Response Time: {sum(response_times)/len(response_times):.2f} seconds")
+if acceptance_times:
+    acceptance_times.sort()
+    print(f"Average Time to Acceptance: {sum(acceptance_times)/len(acceptance_times):.2f} seconds")
+    print(f"95th Percentile Time to Acceptance: {acceptance_times[int(len(acceptance_times) * 0.95) - 1]:.2f} seconds")
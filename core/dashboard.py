@@ -0,0 +1,89 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import DailyStat
+
+# AdminDashboardView figures.
+#
+# compute_stats() reads the DailyStat rollups (core/rollups.py), not the fact tables: one grouped
+# SUM for the all-time totals and one for the signups chart, a few hundred rows whatever the
+# number of users, reviews and bookings.
+# dashboard_stats() serves them from the cache. An entry older than ADMIN_DASHBOARD_FRESH_SECONDS
+# is still served while one background thread recomputes it; only an entry older than
+# ADMIN_DASHBOARD_MAX_STALE_SECONDS (or none at all) is recomputed in the request.
+
+CACHE_KEY = 'admin-dashboard:stats'
+REFRESH_LOCK_KEY = 'admin-dashboard:refreshing'
+
+
+def compute_stats():
+    totals = dict(DailyStat.objects.values_list('metric').annotate(total=Sum('count')).order_by())
+
+    def total(prefix):
+        return sum(count for metric, count in totals.items() if metric.startswith(prefix))
+
+    # 📊 Signups Over Last 6 Months
+    six_months_ago = timezone.localdate() - timedelta(days=180)
+    signup_data = (
+        DailyStat.objects.filter(day__gte=six_months_ago, metric__in=['signups:tourist', 'signups:vendor'])
+        .annotate(month=TruncMonth('day'))
+        .values('month', 'metric')
+        .annotate(count=Sum('count'))
+        .order_by('month')
+    )
+    monthly_data = {}
+    for entry in signup_data:
+        month = monthly_data.setdefault(entry['month'].strftime('%b %Y'), {'tourists': 0, 'vendors': 0})
+        month['tourists' if entry['metric'] == 'signups:tourist' else 'vendors'] += entry['count']
+
+    return {
+        'total_users': total('signups:'),
+        'total_tourists': totals.get('signups:tourist', 0),
+        'total_vendors': totals.get('signups:vendor', 0),
+        'total_reviews': total('reviews:'),
+        'reviews_with_comment': totals.get('reviews:comment', 0),
+        'reviews_without_comment': totals.get('reviews:no_comment', 0),
+        'total_bookings': total('bookings:'),
+        'pending_bookings': totals.get('bookings:pending', 0),
+        'confirmed_bookings': totals.get('bookings:confirmed', 0),
+        'signup_months': list(monthly_data),
+        'signup_tourists': [month['tourists'] for month in monthly_data.values()],
+        'signup_vendors': [month['vendors'] for month in monthly_data.values()],
+    }
+
+
+def refresh():
+    stats = compute_stats()
+    max_stale = getattr(settings, 'ADMIN_DASHBOARD_MAX_STALE_SECONDS', 600)
+    cache.set(CACHE_KEY, {'stats': stats, 'computed_at': time.time()}, max_stale)
+    return stats
+
+
+def _refresh_in_background():
+    def run():
+        try:
+            refresh()
+        finally:
+            cache.delete(REFRESH_LOCK_KEY)
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def dashboard_stats():
+    entry = cache.get(CACHE_KEY)
+    if entry is None:
+        return refresh()
+    fresh_for = getattr(settings, 'ADMIN_DASHBOARD_FRESH_SECONDS', 60)
+    # cache.add() lets a single process start the refresh; the lock expires if that thread dies
+    if time.time() - entry['computed_at'] > fresh_for and cache.add(REFRESH_LOCK_KEY, True, fresh_for):
+        _refresh_in_background()
+    return entry['stats']
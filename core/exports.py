@@ -0,0 +1,86 @@
+import csv
+import datetime
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+from .models import Booking, Review
+
+# Streaming CSV / NDJSON exports for site admins (AdminExportView).
+#
+# Rows are read as values_list() tuples in primary key order, CHUNK_SIZE at a time with
+#     WHERE pk > <last pk of the previous chunk> ORDER BY pk LIMIT CHUNK_SIZE
+# and encoded line by line into a StreamingHttpResponse, so memory stays flat however many rows
+# there are. QuerySet.iterator(chunk_size=...) would instead keep one query's result set open on
+# the mysql.connector connection for as long as the client takes to download the file (or, on a
+# buffered cursor, read it all into memory first). Each keyset chunk here is a short, complete,
+# index-range query, so a slow download never holds a result set open between chunks.
+
+CHUNK_SIZE = 2000
+User = get_user_model()
+
+# dataset -> (model, exported fields)
+DATASETS = {
+    'users': (User, ('id', 'username', 'email', 'is_tourist', 'is_vendor', 'is_active', 'date_joined', 'last_login')),
+    'bookings': (Booking, ('id', 'tourist_id', 'tourist__username', 'vendor_id', 'vendor__business_name',
+                           'booking_date', 'booking_time', 'number_of_people', 'status', 'created_at')),
+    'reviews': (Review, ('id', 'user_id', 'user__username', 'vendor_id', 'vendor__business_name', 'rating',
+                         'comment', 'created_at')),
+}
+
+
+def rows(queryset, fields, chunk_size=CHUNK_SIZE):
+    """Yield `fields` tuples of every row in `queryset`, one keyset chunk per query. fields[0] must be 'id'."""
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(pk__gt=last)
+        chunk = list(chunk.order_by('pk').values_list(*fields)[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1][0]
+
+
+def _cell(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+# Spreadsheets run a cell starting with one of these as a formula; user text gets a leading ' instead
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    value = _cell(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer inside a generator."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(fields, records):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for record in records:
+        yield writer.writerow([_csv_cell(value) for value in record])
+
+
+def ndjson_lines(fields, records):
+    for record in records:
+        yield json.dumps(dict(zip(fields, map(_cell, record)))) + '\n'
+
+
+FORMATS = {
+    'csv': ('text/csv', csv_lines),
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+}
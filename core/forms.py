@@ -13,7 +13,7 @@ class VendorProfileForm(forms.ModelForm):
         fields = [
             'business_name', 'description', 'category',
             'location_text', 'latitude', 'longitude',
-            'phone', 'photo', 'cuisine'
+            'phone', 'photo', 'cuisine', 'seats_per_slot'
         ]
         widgets = {
             'business_name': forms.TextInput(attrs={'class': 'form-control'}),
@@ -25,7 +25,9 @@ class VendorProfileForm(forms.ModelForm):
             'phone': forms.TextInput(attrs={'class': 'form-control'}),
             'photo': forms.ClearableFileInput(attrs={'class': 'form-control'}),
             'cuisine': forms.Select(attrs={'class': 'form-control'}),
+            'seats_per_slot': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
         }
+        labels = {'seats_per_slot': 'Seats per booking slot'}
 
     def clean(self):
         cleaned_data = super().clean()
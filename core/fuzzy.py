@@ -0,0 +1,86 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count
+
+from .models import FoodItem, SearchTrigram, VendorProfile
+from .search import max_results, tokenize
+
+# Typo-tolerant search over vendor names, cuisines and dish names.
+#
+# Each distinct word is split into character trigrams ("ramen" -> "  r", " ra", "ram", "ame",
+# "men", "en ") stored in SearchTrigram. A query word's trigrams pull candidate words from the
+# (trigram, vendor, word) index with one grouped query; candidates are ranked by trigram
+# similarity  shared / (query trigrams + word trigrams - shared), so "thia" still finds "thai".
+
+MAX_WORD_LENGTH = 64
+
+
+def trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def vendor_words(vendor, dish_names):
+    words = set()
+    for text in [vendor.business_name, vendor.cuisine, *dish_names]:
+        words.update(w[:MAX_WORD_LENGTH] for w in tokenize(text))
+    return words
+
+
+def trigram_rows(vendor_id, words):
+    rows = []
+    for word in words:
+        grams = trigrams(word)
+        rows.extend(
+            SearchTrigram(trigram=gram, vendor_id=vendor_id, word=word, word_trigrams=len(grams))
+            for gram in grams
+        )
+    return rows
+
+
+def update_vendor_trigrams(vendor_id):
+    SearchTrigram.objects.filter(vendor_id=vendor_id).delete()
+    vendor = VendorProfile.objects.filter(pk=vendor_id).first()
+    if vendor is not None:
+        dish_names = FoodItem.objects.filter(vendor_id=vendor_id).values_list('name', flat=True)
+        SearchTrigram.objects.bulk_create(trigram_rows(vendor_id, vendor_words(vendor, dish_names)))
+
+
+def rebuild_trigram_index(batch_size=500):
+    SearchTrigram.objects.all().delete()
+    count = 0
+    vendors = VendorProfile.objects.prefetch_related('food_items').order_by('pk')
+    for vendor in vendors.iterator(chunk_size=batch_size):
+        words = vendor_words(vendor, [item.name for item in vendor.food_items.all()])
+        SearchTrigram.objects.bulk_create(trigram_rows(vendor.pk, words), batch_size=batch_size)
+        count += 1
+    return count
+
+
+def ranked_vendor_ids(query, limit=None):
+    """Vendor ids whose words best resemble the words of `query`, most similar first."""
+    if limit is None:
+        limit = max_results()
+    min_similarity = getattr(settings, 'FUZZY_MIN_SIMILARITY', 0.2)
+    max_candidates = getattr(settings, 'FUZZY_MAX_CANDIDATES', 2000)
+
+    scores = defaultdict(float)
+    for word in set(tokenize(query)):
+        grams = trigrams(word[:MAX_WORD_LENGTH])
+        candidates = (
+            SearchTrigram.objects.filter(trigram__in=grams)
+            .values('vendor_id', 'word', 'word_trigrams')
+            .annotate(shared=Count('id'))
+            .order_by('-shared')[:max_candidates]
+        )
+        best = {}
+        for row in candidates:
+            similarity = row['shared'] / (len(grams) + row['word_trigrams'] - row['shared'])
+            if similarity >= min_similarity and similarity > best.get(row['vendor_id'], 0):
+                best[row['vendor_id']] = similarity
+        for vendor_id, similarity in best.items():
+            scores[vendor_id] += similarity
+
+    ranked = sorted(scores, key=lambda vendor_id: (-scores[vendor_id], vendor_id))
+    return ranked[:limit]
@@ -0,0 +1,157 @@
+import math
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+
+from .models import VendorProfile
+
+# Proximity search without spatial extensions.
+#
+# VendorProfile.geohash stores the vendor's 12-character geohash in an ordinary indexed column.
+# Every geohash prefix is a grid cell, and all vendors in a cell share that prefix, so a radius
+# query picks the precision whose cells are about the radius wide, collects the few cells
+# covering the search box and fetches candidates with indexed `geohash LIKE 'prefix%'` range
+# scans. Exact great-circle distances are then computed for the candidates with NumPy.
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+MAX_PRECISION = 12
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def encode(lat, lng, precision=MAX_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        if coordinate >= middle:
+            value = (value << 1) | 1
+            interval[0] = middle
+        else:
+            value <<= 1
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def decode(geohash):
+    """Centre (lat, lng) of a geohash cell."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lng_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if (value >> shift) & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lng_range[0] + lng_range[1]) / 2
+
+
+def cell_size(precision):
+    """(height, width) of a geohash cell in degrees."""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def cell_bounds(geohash):
+    """(south, west, north, east) of a geohash cell."""
+    lat, lng = decode(geohash)
+    height, width = cell_size(len(geohash))
+    return lat - height / 2, lng - width / 2, lat + height / 2, lng + width / 2
+
+
+def covering_cells(south, west, north, east, precision):
+    """Geohash prefixes of every cell at `precision` that intersects the box."""
+    height, width = cell_size(precision)
+    cells = set()
+    lat = max(-90.0, south)
+    while True:
+        lng = max(-180.0, west)
+        while True:
+            cells.add(encode(min(lat, 90.0), min(lng, 180.0), precision))
+            if lng >= east:
+                break
+            lng = min(lng + width, east)
+        if lat >= north:
+            break
+        lat = min(lat + height, north)
+    return cells
+
+
+def precision_for(radius_km, latitude=0.0):
+    """Finest precision whose cells are at least `radius_km` across (so <= ~9 cells cover a radius)."""
+    shrink = max(math.cos(math.radians(latitude)), 0.01)
+    for precision in range(MAX_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        if min(height, width * shrink) * KM_PER_DEGREE >= radius_km:
+            return precision
+    return 1
+
+
+def cell_filter(cells, field='geohash'):
+    condition = Q(pk__in=[])
+    for cell in cells:
+        condition |= Q(**{f'{field}__startswith': cell})
+    return condition
+
+
+def haversine_km(lat, lng, lats, lngs):
+    """Great-circle distances (km) from a point to arrays of points (broadcasts, e.g. lat[:, None])."""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _candidates(lat, lng, radius_km, vendors):
+    lat_delta = radius_km / KM_PER_DEGREE
+    lng_delta = radius_km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    cells = covering_cells(lat - lat_delta, lng - lng_delta, lat + lat_delta, lng + lng_delta,
+                           precision_for(radius_km, lat))
+    rows = list(vendors.filter(cell_filter(cells)).values_list('pk', 'latitude', 'longitude'))
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    lats = np.fromiter((float(row[1]) for row in rows), dtype=float, count=len(rows))
+    lngs = np.fromiter((float(row[2]) for row in rows), dtype=float, count=len(rows))
+    return ids, haversine_km(lat, lng, lats, lngs)
+
+
+def nearby_vendors(lat, lng, radius_km=None, k=None, vendors=None):
+    """
+    [(vendor_id, distance_km)] nearest first, within `radius_km` and/or limited to the `k` nearest.
+    With only `k`, the search radius doubles until k vendors are found or NEARBY_MAX_RADIUS_KM.
+    """
+    if vendors is None:
+        vendors = VendorProfile.objects.all()
+    max_radius = getattr(settings, 'NEARBY_MAX_RADIUS_KM', 50)
+    if radius_km is None and k is None:
+        radius_km = getattr(settings, 'NEARBY_DEFAULT_RADIUS_KM', 5)
+
+    if radius_km is not None:
+        radius = min(radius_km, max_radius)
+        ids, distances = _candidates(lat, lng, radius, vendors)
+    else:
+        radius = 1.0
+        while True:
+            ids, distances = _candidates(lat, lng, radius, vendors)
+            if np.count_nonzero(distances <= radius) >= k or radius >= max_radius:
+                break
+            radius = min(radius * 2, max_radius)
+
+    inside = distances <= radius
+    ids, distances = ids[inside], distances[inside]
+    order = np.lexsort((ids, distances))
+    if k is not None:
+        order = order[:k]
+    return [(int(ids[i]), float(distances[i])) for i in order]
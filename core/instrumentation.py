@@ -0,0 +1,96 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Per-request metrics (RequestMetricsMiddleware).
+#
+# Every SQL statement the request thread runs goes through a connection.execute_wrapper() that
+# counts it and adds its duration, so this works with DEBUG=False and costs two perf_counter()
+# calls per query. The request is split into
+#   view  -- the view function (includes rendering for views using render())
+#   tpl   -- rendering a TemplateResponse (class-based views), after the view returned
+#   db    -- time spent in SQL, part of the above
+#   total -- the whole middleware stack below this one
+# and reported as a Server-Timing header (visible in the browser's network panel) and one log line
+# on the "core.instrumentation" logger: INFO normally, WARNING when the request ran more than
+# REQUEST_METRICS_MAX_QUERIES queries or took longer than REQUEST_METRICS_SLOW_MS.
+# Streaming responses are measured up to the point the stream starts.
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.view_start = self.view_end = self.render_end = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+    def timings(self, total):
+        """[(name, milliseconds), ...] for the phases that ran."""
+        timings = [('db', self.db_time * 1000)]
+        if self.view_start is not None:
+            timings.append(('view', (self.view_end - self.view_start) * 1000))
+        if self.render_end is not None:
+            timings.append(('tpl', (self.render_end - self.view_end) * 1000))
+        timings.append(('total', total * 1000))
+        return timings
+
+
+class RequestMetricsMiddleware:
+    """Count SQL queries and time the view, template rendering and database per request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = request._metrics = RequestMetrics()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(metrics))
+            response = self.get_response(request)
+        if metrics.view_end is None:
+            metrics.view_end = time.perf_counter()
+        timings = metrics.timings(time.perf_counter() - start)
+
+        if getattr(settings, 'REQUEST_METRICS_HEADER', True):
+            response['Server-Timing'] = ', '.join(
+                f'{name};dur={ms:.1f}' + (f';desc="{metrics.queries} queries"' if name == 'db' else '')
+                for name, ms in timings
+            )
+        total_ms = timings[-1][1]
+        slow = (metrics.queries > getattr(settings, 'REQUEST_METRICS_MAX_QUERIES', 50)
+                or total_ms > getattr(settings, 'REQUEST_METRICS_SLOW_MS', 500))
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': getattr(request.resolver_match, 'view_name', None),
+            'status': response.status_code,
+            'queries': metrics.queries,
+            **{f'{name}_ms': round(ms, 1) for name, ms in timings},
+            'slow': slow,
+        }
+        logger.log(logging.WARNING if slow else logging.INFO,
+                   ' '.join(f'{key}={value}' for key, value in fields.items()), extra={'request_metrics': fields})
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Runs after the view returned and just before the response is rendered
+        metrics = request._metrics
+        metrics.view_end = time.perf_counter()
+        response.add_post_render_callback(lambda rendered: setattr(metrics, 'render_end', time.perf_counter()))
+        return response
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from core import fuzzy, search
+from core.models import VendorProfile
+
+
+class Command(BaseCommand):
+    help = "Time the icontains, full-text and fuzzy (trigram) vendor search paths against the current database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*', default=['thai', 'thia', 'ramen', 'ramn', 'seafood'])
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        paths = {
+            'icontains': lambda q: list(
+                VendorProfile.objects.filter(Q(business_name__icontains=q) | Q(description__icontains=q))
+                .values_list('pk', flat=True)
+            ),
+            'fulltext': search.ranked_vendor_ids,
+            'fuzzy': fuzzy.ranked_vendor_ids,
+        }
+        self.stdout.write(f"{VendorProfile.objects.count()} vendors, {options['repeat']} runs per query")
+        self.stdout.write(f"{'query':<12}{'path':<12}{'hits':>6}{'mean ms':>10}")
+        for query in options['queries']:
+            for name, run in paths.items():
+                hits = len(run(query))
+                start = time.perf_counter()
+                for _ in range(options['repeat']):
+                    run(query)
+                mean_ms = (time.perf_counter() - start) * 1000 / options['repeat']
+                self.stdout.write(f"{query:<12}{name:<12}{hits:>6}{mean_ms:>10.2f}")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.recommendations import compute_similar_vendors
+
+
+class Command(BaseCommand):
+    help = "Recompute the similar vendors shown on vendor pages. Run periodically, e.g. nightly from cron."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=None, help="Similar vendors to store per vendor.")
+
+    def handle(self, *args, **options):
+        count = compute_similar_vendors(k=options['k'])
+        self.stdout.write(self.style.SUCCESS(f"Computed similar vendors for {count} vendors."))
@@ -0,0 +1,44 @@
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import booking_queue
+
+
+def run_worker(batch_size, poll_interval, once):
+    try:
+        while True:
+            if not booking_queue.process_batch(batch_size):
+                if once:
+                    return
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = "Turn queued booking requests (BOOKING_ASYNC_INTAKE) into bookings, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Worker processes to run.")
+        parser.add_argument('--batch-size', type=int, default=None, help="Requests claimed per batch.")
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Drain the queue and exit.")
+
+    def handle(self, *args, **options):
+        worker_args = (options['batch_size'], options['poll_interval'], options['once'])
+        if options['workers'] <= 1:
+            run_worker(*worker_args)
+            return
+        connections.close_all()  # each forked worker opens its own connection
+        workers = [multiprocessing.Process(target=run_worker, args=worker_args) for _ in range(options['workers'])]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.join()
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily rollups (DailyStat, VendorDailyStat) from users, reviews and bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help="Only recompute the last N days (periodic catch-up); default: all history.")
+
+    def handle(self, *args, **options):
+        start = None
+        if options['days'] is not None:
+            start = timezone.localdate() - timedelta(days=max(options['days'], 1) - 1)
+        count = rollups.rebuild(start)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} daily stat rows."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core import map_clusters
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed map marker clusters (MapCluster) from vendor locations."
+
+    def handle(self, *args, **options):
+        count = map_clusters.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} map cluster cells."))
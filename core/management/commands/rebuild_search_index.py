@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core import fuzzy, search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the vendor full-text and fuzzy (trigram) search indexes from VendorProfile and FoodItem data."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = search.rebuild_search_index(batch_size=options['batch_size'])
+        fuzzy.rebuild_trigram_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} vendors."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.models import VendorProfile
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored min_price, review_count, rating_sum and average_rating of every vendor."
+
+    def handle(self, *args, **options):
+        vendors = VendorProfile.objects.all()
+        vendors.refresh_min_price()
+        count = vendors.refresh_rating_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt stats for {count} vendors."))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from core.models import Review, VendorProfile
+
+
+class Command(BaseCommand):
+    help = "Find vendors whose stored review_count/rating_sum drifted from their reviews and repair them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report drifted vendors.")
+
+    def handle(self, *args, **options):
+        reviews = Review.objects.filter(vendor=OuterRef('pk')).order_by().values('vendor')
+        drifted = (
+            VendorProfile.objects.annotate(
+                actual_count=Coalesce(Subquery(reviews.annotate(c=Count('id')).values('c')), 0),
+                actual_sum=Coalesce(Subquery(reviews.annotate(s=Sum('rating')).values('s')), 0),
+            )
+            .exclude(review_count=F('actual_count'), rating_sum=F('actual_sum'))
+            .values_list('pk', 'review_count', 'actual_count', 'rating_sum', 'actual_sum')
+        )
+
+        vendor_ids = []
+        for pk, count, actual_count, total, actual_sum in drifted:
+            vendor_ids.append(pk)
+            self.stdout.write(
+                f"Vendor {pk}: review_count {count} -> {actual_count}, rating_sum {total} -> {actual_sum}"
+            )
+
+        if vendor_ids and not options['dry_run']:
+            VendorProfile.objects.filter(pk__in=vendor_ids).refresh_rating_stats()
+        verb = "Found" if options['dry_run'] else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(vendor_ids)} drifted vendors."))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.recommendations import train_recommender
+
+
+class Command(BaseCommand):
+    help = "Train the item-item model behind the tourist dashboard's recommendations. Run periodically, e.g. nightly."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--k', type=int, default=None, help="Similar vendors to keep per vendor.")
+
+    def handle(self, *args, **options):
+        count = train_recommender(k=options['k'])
+        self.stdout.write(self.style.SUCCESS(f"Trained recommendations over {count} vendors."))
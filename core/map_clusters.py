@@ -0,0 +1,149 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from . import geo
+from .models import MapCluster, VendorProfile
+
+# Server-side marker clustering for map viewports.
+#
+# MapCluster holds, for every geohash cell at precisions 1..MAP_CLUSTER_MAX_PRECISION, the number
+# of vendors inside it and the sums of their coordinates (centroid = sum / count). A map zoom level
+# maps to the precision whose cells are about a quarter of a map tile wide, and a viewport request
+# reads that precision's rows with a few indexed prefix scans instead of loading every vendor.
+# Adding, moving or removing a vendor only touches the cells around its old and new position
+# (see the VendorProfile signals); rebuild() recomputes every row from VendorProfile.
+
+CELLS_PER_TILE_BITS = 2  # 4 cells across a 256px map tile
+MAX_PREFIXES = 32  # coarse prefixes scanned per viewport query
+
+
+def max_precision():
+    return getattr(settings, 'MAP_CLUSTER_MAX_PRECISION', 7)
+
+
+def location(latitude, longitude):
+    """(lat, lng) as stored (6 decimal places), or None for vendors without a location."""
+    if latitude is None or longitude is None:
+        return None
+    return round(float(latitude), 6), round(float(longitude), 6)
+
+
+def aggregate(locations, precision):
+    """{(precision, cell): [count, latitude_sum, longitude_sum]} for every cell up to `precision`."""
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    for lat, lng in locations:
+        geohash = geo.encode(lat, lng, precision)
+        for p in range(1, precision + 1):
+            total = totals[(p, geohash[:p])]
+            total[0] += 1
+            total[1] += lat
+            total[2] += lng
+    return totals
+
+
+def rebuild(batch_size=1000):
+    located = VendorProfile.objects.exclude(geohash='').values_list('latitude', 'longitude')
+    totals = aggregate((location(*row) for row in located.iterator()), max_precision())
+    with transaction.atomic():
+        MapCluster.objects.all().delete()
+        MapCluster.objects.bulk_create([
+            MapCluster(precision=p, cell=cell, vendor_count=count, latitude_sum=lat_sum, longitude_sum=lng_sum)
+            for (p, cell), (count, lat_sum, lng_sum) in totals.items()
+        ], batch_size=batch_size)
+    return len(totals)
+
+
+def _shift(point, sign):
+    lat, lng = point
+    geohash = geo.encode(lat, lng, max_precision())
+    cells = [geohash[:p] for p in range(1, len(geohash) + 1)]
+    if sign > 0:
+        # Create missing cells empty, then add to all of them in one UPDATE (safe under concurrency)
+        MapCluster.objects.bulk_create(
+            [MapCluster(precision=len(cell), cell=cell) for cell in cells], ignore_conflicts=True
+        )
+    # Cells emptied here stay as zero rows until the next rebuild; viewport queries skip them
+    MapCluster.objects.filter(precision__in=range(1, len(cells) + 1), cell__in=cells).update(
+        vendor_count=F('vendor_count') + sign,
+        latitude_sum=F('latitude_sum') + sign * lat,
+        longitude_sum=F('longitude_sum') + sign * lng,
+    )
+
+
+def move_vendor(old, new):
+    """Apply a vendor moving from `old` to `new` ((lat, lng) or None for added/removed/no location)."""
+    if old == new:
+        return
+    if old is not None:
+        _shift(old, -1)
+    if new is not None:
+        _shift(new, 1)
+
+
+def precision_for_zoom(zoom):
+    # A web map tile at `zoom` spans 360 / 2**zoom degrees of longitude, and a geohash of
+    # precision p splits longitude into 2**ceil(5p / 2) cells
+    bits = zoom + CELLS_PER_TILE_BITS
+    return max(1, min(max_precision(), (2 * bits + 2) // 5))
+
+
+def _boxes(south, west, north, east):
+    south, north = max(south, -90.0), min(north, 90.0)
+    if west > east:  # viewport crosses the antimeridian
+        return [(south, west, north, 180.0), (south, -180.0, north, east)]
+    return [(south, max(west, -180.0), north, min(east, 180.0))]
+
+
+def _prefixes(box, precision):
+    """Covering cells of `box` at the finest precision <= `precision` that needs few of them."""
+    south, west, north, east = box
+    for p in range(precision, 0, -1):
+        height, width = geo.cell_size(p)
+        if ((north - south) // height + 2) * ((east - west) // width + 2) <= MAX_PREFIXES:
+            break
+    return geo.covering_cells(south, west, north, east, p)
+
+
+def _intersects(cell, box):
+    south, west, north, east = geo.cell_bounds(cell)
+    return south <= box[2] and north >= box[0] and west <= box[3] and east >= box[1]
+
+
+def viewport_clusters(south, west, north, east, zoom):
+    """(precision, clusters) for the map viewport; each cluster is a dict with count and centroid."""
+    precision = precision_for_zoom(zoom)
+    clusters = []
+    for box in _boxes(south, west, north, east):
+        rows = MapCluster.objects.filter(
+            geo.cell_filter(_prefixes(box, precision), field='cell'),
+            precision=precision, vendor_count__gt=0,
+        )
+        for row in rows:
+            if _intersects(row.cell, box):
+                clusters.append({
+                    'cell': row.cell,
+                    'count': row.vendor_count,
+                    'latitude': row.latitude_sum / row.vendor_count,
+                    'longitude': row.longitude_sum / row.vendor_count,
+                })
+    return precision, clusters
+
+
+def viewport_vendors(south, west, north, east, limit=None):
+    """Individual vendors in the viewport (for zoom levels where clusters would hold one vendor)."""
+    if limit is None:
+        limit = getattr(settings, 'MAP_MAX_MARKERS', 500)
+    vendors = []
+    for box in _boxes(south, west, north, east):
+        vendors.extend(
+            VendorProfile.objects.filter(
+                geo.cell_filter(_prefixes(box, max_precision())),
+                latitude__gte=box[0], longitude__gte=box[1], latitude__lte=box[2], longitude__lte=box[3],
+            ).order_by('pk')[:limit - len(vendors)]
+        )
+        if len(vendors) >= limit:
+            break
+    return vendors
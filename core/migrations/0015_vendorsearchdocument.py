@@ -0,0 +1,84 @@
+# Generated by Django 4.2.20 on 2026-10-17 20:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE core_vendorsearch_fts USING fts5("
+    "document, content='core_vendorsearchdocument', content_rowid='vendor_id')",
+    "CREATE TRIGGER core_vendorsearch_ai AFTER INSERT ON core_vendorsearchdocument BEGIN "
+    "INSERT INTO core_vendorsearch_fts(rowid, document) VALUES (new.vendor_id, new.document); END",
+    "CREATE TRIGGER core_vendorsearch_ad AFTER DELETE ON core_vendorsearchdocument BEGIN "
+    "INSERT INTO core_vendorsearch_fts(core_vendorsearch_fts, rowid, document) "
+    "VALUES ('delete', old.vendor_id, old.document); END",
+    "CREATE TRIGGER core_vendorsearch_au AFTER UPDATE ON core_vendorsearchdocument BEGIN "
+    "INSERT INTO core_vendorsearch_fts(core_vendorsearch_fts, rowid, document) "
+    "VALUES ('delete', old.vendor_id, old.document); "
+    "INSERT INTO core_vendorsearch_fts(rowid, document) VALUES (new.vendor_id, new.document); END",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS core_vendorsearch_au",
+    "DROP TRIGGER IF EXISTS core_vendorsearch_ad",
+    "DROP TRIGGER IF EXISTS core_vendorsearch_ai",
+    "DROP TABLE IF EXISTS core_vendorsearch_fts",
+]
+MYSQL_FORWARD = [
+    "ALTER TABLE core_vendorsearchdocument ADD FULLTEXT INDEX core_vendorsearch_ft (document)",
+]
+MYSQL_BACKWARD = [
+    "ALTER TABLE core_vendorsearchdocument DROP INDEX core_vendorsearch_ft",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_FORWARD)
+    elif vendor == 'mysql':
+        _run(schema_editor, MYSQL_FORWARD)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_BACKWARD)
+    elif vendor == 'mysql':
+        _run(schema_editor, MYSQL_BACKWARD)
+
+
+def populate_documents(apps, schema_editor):
+    VendorProfile = apps.get_model('core', 'VendorProfile')
+    VendorSearchDocument = apps.get_model('core', 'VendorSearchDocument')
+    documents = []
+    for vendor in VendorProfile.objects.prefetch_related('food_items'):
+        parts = [vendor.business_name, vendor.description, vendor.cuisine, vendor.category, vendor.location_text]
+        for item in vendor.food_items.all():
+            parts += [item.name, item.description]
+        documents.append(VendorSearchDocument(vendor_id=vendor.pk, document='\n'.join(p for p in parts if p)))
+    VendorSearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_alter_vendorprofile_cuisine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorSearchDocument',
+            fields=[
+                ('vendor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='core.vendorprofile')),
+                ('document', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.20 on 2026-10-17 20:22
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+
+def backfill_vendor_stats(apps, schema_editor):
+    VendorProfile = apps.get_model('core', 'VendorProfile')
+    FoodItem = apps.get_model('core', 'FoodItem')
+    Review = apps.get_model('core', 'Review')
+    items = FoodItem.objects.filter(vendor=OuterRef('pk')).order_by().values('vendor')
+    reviews = Review.objects.filter(vendor=OuterRef('pk')).order_by().values('vendor')
+    VendorProfile.objects.update(
+        min_price=Subquery(items.annotate(m=Min('price')).values('m')),
+        review_count=Coalesce(Subquery(reviews.annotate(c=Count('id')).values('c')), 0),
+        rating_sum=Coalesce(Subquery(reviews.annotate(s=Sum('rating')).values('s')), 0),
+        average_rating=Coalesce(Round(Subquery(reviews.annotate(a=Avg('rating')).values('a')), 2), Value(0.0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_vendorsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='min_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='vendorprofile',
+            name='average_rating',
+            field=models.FloatField(db_index=True, default=0.0),
+        ),
+        migrations.AddIndex(
+            model_name='fooditem',
+            index=models.Index(fields=['vendor', 'price'], name='core_fooditem_vendor_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorprofile',
+            index=models.Index(fields=['cuisine', 'business_name'], name='core_vendor_cuisine_name_idx'),
+        ),
+        migrations.RunPython(backfill_vendor_stats, migrations.RunPython.noop),
+    ]
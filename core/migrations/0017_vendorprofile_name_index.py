@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_vendorprofile_search_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendorprofile',
+            index=models.Index(fields=['business_name', 'id'], name='core_vendor_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.20 on 2026-10-17 20:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import re
+
+
+def populate_trigrams(apps, schema_editor):
+    VendorProfile = apps.get_model('core', 'VendorProfile')
+    SearchTrigram = apps.get_model('core', 'SearchTrigram')
+    for vendor in VendorProfile.objects.prefetch_related('food_items'):
+        words = set()
+        for text in [vendor.business_name, vendor.cuisine] + [item.name for item in vendor.food_items.all()]:
+            words.update(w[:64] for w in re.findall(r'\w+', (text or '').lower()))
+        rows = []
+        for word in words:
+            padded = f'  {word} '
+            grams = {padded[i:i + 3] for i in range(len(padded) - 2)}
+            rows += [SearchTrigram(trigram=g, vendor_id=vendor.pk, word=word, word_trigrams=len(grams)) for g in grams]
+        SearchTrigram.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_vendorprofile_name_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(max_length=3)),
+                ('word', models.CharField(max_length=64)),
+                ('word_trigrams', models.PositiveSmallIntegerField()),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_trigrams', to='core.vendorprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['trigram', 'vendor', 'word'], name='core_trigram_lookup_idx')],
+            },
+        ),
+        migrations.RunPython(populate_trigrams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.20 on 2026-10-17 20:36
+
+from django.db import migrations, models
+
+
+def backfill_geohash(apps, schema_editor):
+    from core.geo import encode
+
+    VendorProfile = apps.get_model('core', 'VendorProfile')
+    located = VendorProfile.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    for vendor in located.only('pk', 'latitude', 'longitude').iterator():
+        VendorProfile.objects.filter(pk=vendor.pk).update(
+            geohash=encode(float(vendor.latitude), float(vendor.longitude))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_searchtrigram'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.20 on 2026-10-17 20:40
+
+from django.db import migrations, models
+
+
+def populate_map_clusters(apps, schema_editor):
+    from core.map_clusters import aggregate, location, max_precision
+
+    VendorProfile = apps.get_model('core', 'VendorProfile')
+    MapCluster = apps.get_model('core', 'MapCluster')
+    located = VendorProfile.objects.exclude(geohash='').values_list('latitude', 'longitude')
+    totals = aggregate((location(*row) for row in located.iterator()), max_precision())
+    MapCluster.objects.bulk_create([
+        MapCluster(precision=p, cell=cell, vendor_count=count, latitude_sum=lat_sum, longitude_sum=lng_sum)
+        for (p, cell), (count, lat_sum, lng_sum) in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_vendorprofile_geohash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MapCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precision', models.PositiveSmallIntegerField()),
+                ('cell', models.CharField(max_length=12)),
+                ('vendor_count', models.IntegerField(default=0)),
+                ('latitude_sum', models.FloatField(default=0.0)),
+                ('longitude_sum', models.FloatField(default=0.0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='mapcluster',
+            constraint=models.UniqueConstraint(fields=('precision', 'cell'), name='core_mapcluster_cell_unique'),
+        ),
+        migrations.RunPython(populate_map_clusters, migrations.RunPython.noop),
+    ]
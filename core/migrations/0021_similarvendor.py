@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-17 20:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_mapcluster'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarVendor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField()),
+                ('score', models.FloatField()),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='core.vendorprofile')),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_entries', to='core.vendorprofile')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='similarvendor',
+            constraint=models.UniqueConstraint(fields=('vendor', 'rank'), name='core_similarvendor_rank_unique'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.20 on 2026-10-17 20:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_slots(apps, schema_editor):
+    from collections import defaultdict
+
+    from core.reservations import HOLDING_STATUSES, slot_start
+
+    Booking = apps.get_model('core', 'Booking')
+    BookingSlot = apps.get_model('core', 'BookingSlot')
+    VendorProfile = apps.get_model('core', 'VendorProfile')
+    reserved = defaultdict(int)
+    held = Booking.objects.filter(status__in=HOLDING_STATUSES).values_list(
+        'vendor_id', 'booking_date', 'booking_time', 'number_of_people')
+    for vendor_id, booking_date, booking_time, people in held.iterator():
+        reserved[(vendor_id, booking_date, slot_start(booking_time))] += people
+    seats = dict(VendorProfile.objects.values_list('pk', 'seats_per_slot'))
+    # Existing bookings are honoured even where they already exceed the default capacity
+    BookingSlot.objects.bulk_create([
+        BookingSlot(vendor_id=vendor_id, date=day, start_time=start, reserved=taken,
+                    capacity=max(seats[vendor_id], taken))
+        for (vendor_id, day, start), taken in reserved.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_similarvendor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vendorprofile',
+            name='seats_per_slot',
+            field=models.PositiveIntegerField(default=20),
+        ),
+        migrations.CreateModel(
+            name='BookingSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('capacity', models.PositiveIntegerField()),
+                ('reserved', models.PositiveIntegerField(default=0)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_slots', to='core.vendorprofile')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='bookingslot',
+            constraint=models.UniqueConstraint(fields=('vendor', 'date', 'start_time'), name='core_bookingslot_unique'),
+        ),
+        migrations.RunPython(backfill_slots, migrations.RunPython.noop),
+    ]
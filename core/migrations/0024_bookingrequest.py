@@ -0,0 +1,44 @@
+# Generated by Django 4.2.20 on 2026-10-17 20:55
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_booking_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('booking_date', models.DateField()),
+                ('booking_time', models.TimeField()),
+                ('number_of_people', models.PositiveIntegerField()),
+                ('special_request', models.TextField(blank=True, null=True)),
+                ('idempotency_key', models.CharField(blank=True, max_length=64, null=True)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('processing', 'Processing'), ('accepted', 'Accepted'), ('rejected', 'Rejected'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='intake_request', to='core.booking')),
+                ('tourist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_requests', to=settings.AUTH_USER_MODEL)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_requests', to='core.vendorprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='core_bookingrequest_queue_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bookingrequest',
+            constraint=models.UniqueConstraint(fields=('tourist', 'idempotency_key'), name='core_bookingrequest_idempotency_unique'),
+        ),
+    ]
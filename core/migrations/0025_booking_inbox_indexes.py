@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-17 20:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_bookingrequest'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['vendor', 'status', 'booking_date'], name='core_booking_vendor_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['tourist', 'booking_date'], name='core_booking_tourist_date_idx'),
+        ),
+    ]
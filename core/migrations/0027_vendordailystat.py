@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-17 21:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_dailystat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('metric', models.CharField(max_length=32)),
+                ('count', models.IntegerField(default=0)),
+                ('vendor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.vendorprofile')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='vendordailystat',
+            constraint=models.UniqueConstraint(fields=('vendor', 'day', 'metric'), name='core_vendordailystat_unique'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.20 on 2026-10-17 21:30
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_vendordailystat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vendorprofile',
+            name='seats_per_slot',
+            field=models.PositiveIntegerField(default=20, validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.20 on 2026-10-17 21:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_vendorprofile_seats_per_slot_min'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['vendor', 'booking_date', 'booking_time'], name='core_booking_vendor_date_idx'),
+        ),
+    ]
@@ -1,9 +1,16 @@
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.core.validators import MinValueValidator
+from django.db import models, transaction
 from django.conf import settings
 from django import forms
 from django.db.models.signals import post_save, post_delete
-from django.db.models import Avg
+from django.db.models import Avg, Count, F, FloatField, Min, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf, Round
 from django.dispatch import receiver
 
 class CustomUser(AbstractUser):
@@ -21,6 +28,45 @@ class TouristProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     def __str__(self):
         return str(self.full_name)
+# Stored per-vendor search stats, recomputed from the vendor's own FoodItem/Review rows
+class VendorProfileQuerySet(models.QuerySet):
+    def refresh_min_price(self):
+        cheapest = (
+            FoodItem.objects.filter(vendor=OuterRef('pk'))
+            .order_by().values('vendor').annotate(m=Min('price')).values('m')
+        )
+        return self.update(min_price=Subquery(cheapest))
+
+    def refresh_rating_stats(self):
+        reviews = Review.objects.filter(vendor=OuterRef('pk')).order_by().values('vendor')
+        return self.update(
+            review_count=Coalesce(Subquery(reviews.annotate(c=Count('id')).values('c')), 0),
+            rating_sum=Coalesce(Subquery(reviews.annotate(s=Sum('rating')).values('s')), 0),
+            average_rating=Coalesce(
+                Round(Subquery(reviews.annotate(a=Avg('rating')).values('a')), 2), Value(0.0)
+            ),
+        )
+
+    def with_cover_item(self):
+        """Prefetch each vendor's first food item (see VendorProfile.cover_item) in one query."""
+        return self.prefetch_related(
+            models.Prefetch('food_items', queryset=FoodItem.objects.order_by('pk')[:1], to_attr='cover_items')
+        )
+
+    def apply_rating_delta(self, count, total):
+        """Add `count` reviews worth `total` stars in one atomic UPDATE (no aggregate)."""
+        new_count = F('review_count') + count
+        new_sum = F('rating_sum') + total
+        # average_rating goes first: MySQL evaluates SET assignments left to right,
+        # so it must read review_count/rating_sum before they are overwritten.
+        return self.update(
+            average_rating=Coalesce(
+                Round(Cast(new_sum, FloatField()) / NullIf(new_count, 0), 2), Value(0.0)
+            ),
+            rating_sum=new_sum,
+            review_count=new_count,
+        )
+
 # NEW VendorProfile
 class VendorProfile(models.Model):
     CUISINE_CHOICES = [
@@ -43,16 +89,115 @@ class VendorProfile(models.Model):
     photo = models.ImageField(upload_to='vendor_photos/', blank=True, null=True)
     cuisine = models.CharField(max_length=50, choices=CUISINE_CHOICES, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    average_rating = models.FloatField(default=0.0)  # Stored value
+    average_rating = models.FloatField(default=0.0, db_index=True)  # Stored value
+    # Denormalized for SearchResultsView (kept current by the FoodItem/Review signals below)
+    min_price = models.DecimalField(max_digits=8, decimal_places=2, blank=True, null=True, db_index=True)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    # Derived from latitude/longitude on save; indexed grid cell for proximity search (core/geo.py)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
+    # Seats per booking slot (BOOKING_SLOT_MINUTES) for new BookingSlot rows (see core/reservations.py)
+    seats_per_slot = models.PositiveIntegerField(default=20, validators=[MinValueValidator(1)])
+
+    objects = VendorProfileQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cuisine', 'business_name'], name='core_vendor_cuisine_name_idx'),
+            models.Index(fields=['business_name', 'id'], name='core_vendor_name_id_idx'),
+        ]
+
+    # Written only through VendorProfileQuerySet / the review and food item signals
+    STATS_FIELDS = ('average_rating', 'min_price', 'review_count', 'rating_sum')
+
+    def save(self, *args, **kwargs):
+        from .geo import encode  # core.geo imports this module
+
+        has_location = self.latitude is not None and self.longitude is not None
+        self.geohash = encode(float(self.latitude), float(self.longitude)) if has_location else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        # A full save of a stale instance (profile form, user post_save) must not overwrite the stats
+        if not self._state.adding and update_fields is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.STATS_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def cover_item(self):
+        """The food item shown on vendor cards; prefetch with VendorProfile.objects.with_cover_item()."""
+        if hasattr(self, 'cover_items'):
+            return self.cover_items[0] if self.cover_items else None
+        return self.food_items.order_by('pk').first()
 
     def update_average_rating(self):
-        avg = self.reviews.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
-        self.average_rating = round(avg, 2)
-        self.save()
+        VendorProfile.objects.filter(pk=self.pk).refresh_rating_stats()
+        self.refresh_from_db(fields=['average_rating', 'review_count', 'rating_sum'])
 
     def __str__(self):
         return str(self.business_name)
-    
+
+# NEW VendorSearchDocument (denormalized text searched by SearchResultsView, see core/search.py)
+class VendorSearchDocument(models.Model):
+    vendor = models.OneToOneField(VendorProfile, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    document = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search document for vendor {self.vendor_id}"
+
+# NEW Fuzzy search index: one row per character trigram of each distinct word in a vendor's
+# name, cuisine and dish names (see core/fuzzy.py)
+class SearchTrigram(models.Model):
+    trigram = models.CharField(max_length=3)
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='search_trigrams')
+    word = models.CharField(max_length=64)
+    word_trigrams = models.PositiveSmallIntegerField()  # trigram count of `word`, for similarity
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['trigram', 'vendor', 'word'], name='core_trigram_lookup_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.trigram} ({self.word})"
+
+# NEW Map marker clusters: vendor count and coordinate sums per geohash cell, for every cell
+# precision up to MAP_CLUSTER_MAX_PRECISION (see core/map_clusters.py)
+class MapCluster(models.Model):
+    precision = models.PositiveSmallIntegerField()
+    cell = models.CharField(max_length=12)
+    vendor_count = models.IntegerField(default=0)
+    latitude_sum = models.FloatField(default=0.0)
+    longitude_sum = models.FloatField(default=0.0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['precision', 'cell'], name='core_mapcluster_cell_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.cell} ({self.vendor_count} vendors)"
+
+# NEW Precomputed "similar vendors": the top SIMILAR_VENDORS_K vendors per vendor, written by
+# the compute_similar_vendors command (see core/recommendations.py)
+class SimilarVendor(models.Model):
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='similar_entries')
+    similar = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='similar_to')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'rank'], name='core_similarvendor_rank_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor_id} -> {self.similar_id} (#{self.rank})"
+
 # NEW FoodItem
 class FoodItem(models.Model):
     vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='food_items')
@@ -65,6 +210,12 @@ class FoodItem(models.Model):
 
       # Ensure a default manager is defined
     objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['vendor', 'price'], name='core_fooditem_vendor_price_idx'),
+        ]
+
     def __str__(self):
         return str(self.name)
 # NEW Booking
@@ -84,15 +235,167 @@ class Booking(models.Model):
         ('declined', 'Declined'),
     ]
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
-    
+    # Client-supplied key of the submission that created this booking (see core/reservations.py)
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tourist', 'idempotency_key'], name='core_booking_idempotency_unique'),
+        ]
+        indexes = [
+            # Vendor inbox tabs (VendorBookingListView) and a tourist's own bookings, newest first
+            models.Index(fields=['vendor', 'status', 'booking_date'], name='core_booking_vendor_inbox_idx'),
+            models.Index(fields=['vendor', 'booking_date', 'booking_time'], name='core_booking_vendor_date_idx'),
+            models.Index(fields=['tourist', 'booking_date'], name='core_booking_tourist_date_idx'),
+        ]
+
     def __str__(self):
         return f"Booking by {self.tourist.username} at {self.vendor.business_name}"
 
+# NEW BookingSlot: seats taken per vendor, date and slot start, updated atomically by
+# core/reservations.py (one row lock per slot, so unrelated vendors never wait on each other)
+class BookingSlot(models.Model):
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='booking_slots')
+    date = models.DateField()
+    start_time = models.TimeField()
+    capacity = models.PositiveIntegerField()
+    reserved = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'date', 'start_time'], name='core_bookingslot_unique'),
+        ]
+
+    @property
+    def remaining(self):
+        return max(self.capacity - self.reserved, 0)
+
+    def __str__(self):
+        return f"{self.vendor_id} {self.date} {self.start_time}: {self.reserved}/{self.capacity}"
+
+# NEW BookingRequest: durable intake queue for BOOKING_ASYNC_INTAKE mode; the form is validated
+# and stored here, and the process_booking_queue workers turn requests into bookings in batches
+# (see core/booking_queue.py)
+class BookingRequest(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('processing', 'Processing'),
+        ('accepted', 'Accepted'),
+        ('rejected', 'Rejected'),
+        ('failed', 'Failed'),
+    ]
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    tourist = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='booking_requests')
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='booking_requests')
+    booking_date = models.DateField()
+    booking_time = models.TimeField()
+    number_of_people = models.PositiveIntegerField()
+    special_request = models.TextField(blank=True, null=True)
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    booking = models.OneToOneField(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='intake_request')
+    error = models.CharField(max_length=255, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tourist', 'idempotency_key'], name='core_bookingrequest_idempotency_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'id'], name='core_bookingrequest_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"Booking request {self.token} ({self.status})"
+
+# NEW DailyStat: per-day counts behind the admin dashboard (signups by role, reviews with/without
+# comment, bookings by status), kept current by signals and rebuilt by `manage.py rebuild_daily_stats`
+class DailyStat(models.Model):
+    day = models.DateField()
+    metric = models.CharField(max_length=32)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'metric'], name='core_dailystat_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.metric}: {self.count}"
+
+# NEW VendorDailyStat: per-vendor, per-day counts behind the vendor analytics page (core/rollups.py):
+# bookings by status, party size and hour (by booking date) and reviews by rating (by review date)
+class VendorDailyStat(models.Model):
+    vendor = models.ForeignKey(VendorProfile, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    metric = models.CharField(max_length=32)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'day', 'metric'], name='core_vendordailystat_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor_id} {self.day} {self.metric}: {self.count}"
+
 # NEW 
 class Cuisine(models.Model):
     name = models.CharField(max_length=100, unique=True)
     def __str__(self):
         return self.name
+# Batches rating deltas per vendor while active (see batched_rating_updates)
+_rating_batch = threading.local()
+
+
+@contextmanager
+def batched_rating_updates():
+    """Collect review rating deltas and apply them as one UPDATE per vendor on exit."""
+    if getattr(_rating_batch, 'pending', None) is not None:
+        yield
+        return
+    _rating_batch.pending = defaultdict(lambda: [0, 0])
+    try:
+        with transaction.atomic():
+            yield
+            for vendor_id, (count, total) in _rating_batch.pending.items():
+                if count or total:
+                    VendorProfile.objects.filter(pk=vendor_id).apply_rating_delta(count, total)
+    finally:
+        _rating_batch.pending = None
+
+
+def record_rating_delta(vendor_id, count, total):
+    pending = getattr(_rating_batch, 'pending', None)
+    if pending is None:
+        VendorProfile.objects.filter(pk=vendor_id).apply_rating_delta(count, total)
+    else:
+        pending[vendor_id][0] += count
+        pending[vendor_id][1] += total
+
+
+class ReviewQuerySet(models.QuerySet):
+    # bulk_create skips post_save and queryset delete fires post_delete per row; batch both so
+    # every Review receiver sees each row and rating deltas land as one UPDATE per vendor.
+    # bulk_create skips pre_save too, so the daily rollups are added here in one batch.
+    def bulk_create(self, objs, *args, **kwargs):
+        from . import rollups  # core.rollups imports this module
+        with batched_rating_updates():
+            objs = super().bulk_create(objs, *args, **kwargs)
+            rollups.move_all([([], rollups.keys_of(review)) for review in objs])
+            for review in objs:
+                post_save.send(sender=Review, instance=review, created=True, update_fields=None,
+                               raw=False, using=self.db)
+        return objs
+
+    def delete(self):
+        with batched_rating_updates():
+            return super().delete()
+
 # NEW Review Model
 class Review(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='reviews')
@@ -101,17 +404,50 @@ class Review(models.Model):
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = ReviewQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the vendor's stored rating stats currently include
+        if 'vendor_id' in instance.__dict__ and 'rating' in instance.__dict__:
+            instance._counted = (instance.vendor_id, instance.rating)
+        return instance
+
     def __str__(self):
         user_name = str(self.user.username) if self.user and getattr(self.user, 'username', None) else "Unknown User"
         vendor_name = str(self.vendor.business_name) if self.vendor and getattr(self.vendor, 'business_name', None) else "Unknown Vendor"
         return f"{user_name}'s review for {vendor_name}"
 
-# Signal: Auto-update average_rating on review save or delete
-@receiver([post_save, post_delete], sender=Review)
-def update_vendor_rating(sender, instance, **kwargs):
-    vendor = instance.vendor
-    avg = vendor.reviews.aggregate(avg_rating=Avg('rating'))['avg_rating'] or 0
-    vendor.average_rating = round(avg, 2)
-    vendor.save()
+# Signal: Auto-update average_rating on review save or delete (incremental, O(1) per review)
+@receiver(post_save, sender=Review)
+def update_vendor_rating(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, '_counted', None)
+    if not created and previous is None:
+        # Saved without being loaded first: the counted rating is unknown, recount this vendor
+        VendorProfile.objects.filter(pk=instance.vendor_id).refresh_rating_stats()
+    elif previous:
+        old_vendor_id, old_rating = previous
+        if (old_vendor_id, old_rating) == (instance.vendor_id, instance.rating):
+            return
+        record_rating_delta(old_vendor_id, -1, -old_rating)
+        record_rating_delta(instance.vendor_id, 1, instance.rating)
+    else:
+        record_rating_delta(instance.vendor_id, 1, instance.rating)
+    instance._counted = (instance.vendor_id, instance.rating)
+
+
+@receiver(post_delete, sender=Review)
+def remove_vendor_rating(sender, instance, **kwargs):
+    vendor_id, rating = getattr(instance, '_counted', (instance.vendor_id, instance.rating))
+    record_rating_delta(vendor_id, -1, -rating)
+
+# Signal: Auto-update min_price on food item save or delete
+@receiver([post_save, post_delete], sender=FoodItem)
+def update_vendor_min_price(sender, instance, raw=False, **kwargs):
+    if not raw:
+        VendorProfile.objects.filter(pk=instance.vendor_id).refresh_min_price()
 
 
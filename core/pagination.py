@@ -0,0 +1,84 @@
+import base64
+import binascii
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+# Keyset ("seek") pagination: each page is `WHERE (sort keys) > (last row's keys) ORDER BY ... LIMIT n`,
+# so page 1000 costs the same as page 1. The last key must be unique (normally 'pk').
+
+
+def encode_cursor(values):
+    raw = json.dumps([_jsonable(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the list of key values in `cursor`, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def _jsonable(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return value
+
+
+class KeysetPaginator:
+    """
+    `ordering` is a list of (field, descending, nullable) tuples; nullable keys sort NULLs last.
+    """
+
+    def __init__(self, ordering, page_size):
+        self.ordering = ordering
+        self.page_size = page_size
+
+    def order_by(self):
+        expressions = []
+        for field, descending, nullable in self.ordering:
+            expression = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+            expressions.append(expression if nullable else (('-' if descending else '') + field))
+        return expressions
+
+    def seek(self, values):
+        """Q matching rows strictly after the row whose sort keys are `values`."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending, nullable), value in zip(self.ordering, values):
+            if value is not None:
+                after = Q(**{f"{field}__{'lt' if descending else 'gt'}": value})
+                if nullable:
+                    after |= Q(**{f"{field}__isnull": True})
+                condition |= equal & after
+                equal &= Q(**{field: value})
+            else:
+                equal &= Q(**{f"{field}__isnull": True})
+        return condition
+
+    def page(self, queryset, cursor=None):
+        """Return (rows, next_cursor); next_cursor is None on the last page."""
+        queryset = queryset.order_by(*self.order_by())
+        values = decode_cursor(cursor)
+        if values is not None and len(values) == len(self.ordering):
+            try:
+                queryset = queryset.filter(self.seek(values))
+            except (TypeError, ValueError, ValidationError):
+                pass  # Tampered cursor: start from the first page
+        rows = list(queryset[:self.page_size + 1])
+        next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            next_cursor = encode_cursor([getattr(rows[-1], field) for field, _, _ in self.ordering])
+        return rows, next_cursor
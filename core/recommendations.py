@@ -0,0 +1,255 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from scipy import sparse
+
+from . import geo
+from .models import Booking, Review, SimilarVendor, VendorProfile
+from .search import PRICE_BUCKETS
+
+# "Similar vendors" for VendorDetailView, computed offline by `manage.py compute_similar_vendors`.
+#
+# score(a, b) is a weighted sum of
+#   cuisine  -- 1 when a and b share a cuisine
+#   price    -- 1 for the same price band (search.PRICE_BUCKETS), 0.5 for a neighbouring band
+#   distance -- exp(-km / SIMILAR_VENDORS_DISTANCE_KM)
+#   together -- cosine similarity of the tourists who booked or reviewed a and b, from one sparse
+#               (tourists x vendors) matrix product
+#   rating   -- b's average rating / 5, a small nudge towards well-rated vendors
+# Scores are computed as dense (block x vendors) arrays a block of vendors at a time, and the
+# top SIMILAR_VENDORS_K of every row are stored in SimilarVendor.
+
+WEIGHTS = {'cuisine': 0.35, 'price': 0.15, 'distance': 0.15, 'together': 0.3, 'rating': 0.05}
+BLOCK_SIZE = 256
+
+
+def _float_array(values):
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=float)
+
+
+def price_bands(min_prices):
+    """Index of the PRICE_BUCKETS band for each price (-1 for vendors without a menu)."""
+    bands = np.full(len(min_prices), -1)
+    priced = ~np.isnan(min_prices)
+    bands[priced] = np.searchsorted(PRICE_BUCKETS, min_prices[priced], side='left')
+    return bands
+
+
+def interaction_matrix(vendor_index, weighted=False):
+    """
+    Sparse (tourists x vendors) matrix of who booked or reviewed which vendor. Entries are 1, or
+    with `weighted` 1 for a booking and rating / 5 for a review (the larger when both).
+    """
+    strengths = {}
+    for user_id, vendor_id in Booking.objects.values_list('tourist_id', 'vendor_id').distinct():
+        strengths[(user_id, vendor_id)] = 1.0
+    for user_id, vendor_id, rating in Review.objects.values_list('user_id', 'vendor_id', 'rating'):
+        strength = rating / 5 if weighted else 1.0
+        strengths[(user_id, vendor_id)] = max(strengths.get((user_id, vendor_id), 0.0), strength)
+    entries = [(user_id, vendor_index[vendor_id], strength)
+               for (user_id, vendor_id), strength in strengths.items() if vendor_id in vendor_index]
+    if not entries:
+        return sparse.csr_matrix((0, len(vendor_index)))
+    users, columns, values = zip(*entries)
+    _, rows = np.unique(users, return_inverse=True)
+    return sparse.csr_matrix((values, (rows, columns)), shape=(rows.max() + 1, len(vendor_index)))
+
+
+def column_cosine(matrix):
+    """Sparse cosine similarity between the columns of `matrix`."""
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+    norms[norms == 0] = 1
+    normalized = matrix @ sparse.diags(1 / norms)
+    return (normalized.T @ normalized).tocsr()
+
+
+def co_interest_matrix(vendor_index):
+    """Sparse (vendors x vendors) cosine similarity of the tourists who booked or reviewed each vendor."""
+    return column_cosine(interaction_matrix(vendor_index))
+
+
+def compute_similar_vendors(k=None, block_size=BLOCK_SIZE):
+    """Replace the SimilarVendor table; returns the number of vendors processed."""
+    if k is None:
+        k = getattr(settings, 'SIMILAR_VENDORS_K', 6)
+    distance_scale = getattr(settings, 'SIMILAR_VENDORS_DISTANCE_KM', 5)
+    rows = list(VendorProfile.objects.order_by('pk').values_list(
+        'pk', 'cuisine', 'min_price', 'latitude', 'longitude', 'average_rating'
+    ))
+    count = len(rows)
+    k = min(k, count - 1)
+    if k <= 0:
+        SimilarVendor.objects.all().delete()
+        return count
+
+    ids, cuisines, min_prices, lats, lngs, ratings = zip(*rows)
+    has_cuisine = np.array([bool(cuisine) for cuisine in cuisines])
+    _, cuisines = np.unique([cuisine or '' for cuisine in cuisines], return_inverse=True)
+    bands = price_bands(_float_array(min_prices))
+    lats, lngs = _float_array(lats), _float_array(lngs)
+    ratings = np.array(ratings, dtype=float) / 5
+    together = co_interest_matrix({pk: i for i, pk in enumerate(ids)})
+
+    entries = []
+    for start in range(0, count, block_size):
+        block = slice(start, min(start + block_size, count))
+        same_cuisine = (cuisines[block, None] == cuisines) & has_cuisine[block, None]
+        priced = (bands[block, None] >= 0) & (bands >= 0)
+        band_match = np.where(priced, np.clip(1 - np.abs(bands[block, None] - bands) / 2, 0, 1), 0)
+        with np.errstate(invalid='ignore'):  # vendors without a location give NaN -> 0
+            distances = geo.haversine_km(lats[block, None], lngs[block, None], lats, lngs)
+            nearness = np.nan_to_num(np.exp(-distances / distance_scale))
+        scores = (
+            WEIGHTS['cuisine'] * same_cuisine
+            + WEIGHTS['price'] * band_match
+            + WEIGHTS['distance'] * nearness
+            + WEIGHTS['together'] * together[block].toarray()
+            + WEIGHTS['rating'] * ratings
+        )
+        local = np.arange(block.stop - block.start)
+        scores[local, local + start] = -np.inf  # a vendor is not similar to itself
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.lexsort((top, -top_scores))  # best first, lower pk on ties
+        for i in local:
+            for rank, j in enumerate(top[i, order[i]], start=1):
+                entries.append(SimilarVendor(
+                    vendor_id=ids[start + i], similar_id=ids[j], rank=rank, score=float(scores[i, j])
+                ))
+
+    with transaction.atomic():
+        SimilarVendor.objects.all().delete()
+        SimilarVendor.objects.bulk_create(entries, batch_size=1000)
+    return count
+
+
+# Personalized "recommended for you" (TouristDashboardView): item-item collaborative filtering.
+#
+# `manage.py train_recommender` takes the weighted interaction matrix above, computes the cosine
+# similarity between vendor columns and keeps each vendor's RECOMMENDER_NEIGHBOURS most similar
+# vendors as fixed-width .npy arrays under RECOMMENDER_MODEL_DIR/<version>/:
+#   vendor_ids.npy  sorted vendor pks; row i of the other arrays describes vendor_ids[i]
+#   neighbours.npy  (vendors x K) int32 row numbers of the neighbours, -1 padded
+#   weights.npy     (vendors x K) float32 similarities
+#   popular.npy     row numbers by number of interested tourists, for tourists without history
+# Each run writes a new version directory and then swaps the CURRENT pointer file. Web processes
+# memory-map the current version once and score a tourist's vendors with array lookups only.
+
+MODEL_ARRAYS = ('vendor_ids', 'neighbours', 'weights', 'popular')
+POPULAR_SIZE = 100
+
+
+def model_dir():
+    return Path(getattr(settings, 'RECOMMENDER_MODEL_DIR', settings.BASE_DIR / 'var' / 'recommender'))
+
+
+def train_recommender(k=None, directory=None):
+    """Build and publish a new model; returns the number of vendors in it."""
+    if k is None:
+        k = getattr(settings, 'RECOMMENDER_NEIGHBOURS', 20)
+    vendor_ids = np.array(VendorProfile.objects.order_by('pk').values_list('pk', flat=True), dtype=np.int64)
+    interactions = interaction_matrix({int(pk): i for i, pk in enumerate(vendor_ids)}, weighted=True)
+    similarity = column_cosine(interactions)
+
+    neighbours = np.full((len(vendor_ids), k), -1, dtype=np.int32)
+    weights = np.zeros((len(vendor_ids), k), dtype=np.float32)
+    for row in range(len(vendor_ids)):
+        start, end = similarity.indptr[row], similarity.indptr[row + 1]
+        columns, values = similarity.indices[start:end], similarity.data[start:end]
+        keep = (columns != row) & (values > 0)
+        columns, values = columns[keep], values[keep]
+        if len(columns) > k:
+            top = np.argpartition(-values, k - 1)[:k]
+            columns, values = columns[top], values[top]
+        order = np.lexsort((columns, -values))
+        neighbours[row, :len(order)] = columns[order]
+        weights[row, :len(order)] = values[order]
+
+    interested = np.asarray((interactions > 0).sum(axis=0)).ravel()
+    popular = np.argsort(-interested, kind='stable')[:POPULAR_SIZE]
+    popular = popular[interested[popular] > 0].astype(np.int32)
+
+    publish_model({'vendor_ids': vendor_ids, 'neighbours': neighbours, 'weights': weights, 'popular': popular},
+                  directory)
+    return len(vendor_ids)
+
+
+def publish_model(arrays, directory=None):
+    directory = Path(directory or model_dir())
+    pointer = directory / 'CURRENT'
+    previous = pointer.read_text().strip() if pointer.exists() else None
+    version = timezone.now().strftime('%Y%m%d%H%M%S%f')
+    (directory / version).mkdir(parents=True)
+    for name in MODEL_ARRAYS:
+        np.save(directory / version / f'{name}.npy', arrays[name])
+    staged = directory / 'CURRENT.tmp'
+    staged.write_text(version)
+    os.replace(staged, pointer)
+    # Keep the previous version for processes that have not switched yet
+    for path in directory.iterdir():
+        if path.is_dir() and path.name not in (version, previous):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class RecommenderModel:
+    def __init__(self, path, version):
+        self.version = version
+        for name in MODEL_ARRAYS:
+            setattr(self, name, np.load(path / f'{name}.npy', mmap_mode='r'))
+
+    def rows(self, vendor_ids):
+        vendor_ids = np.asarray(sorted(vendor_ids), dtype=np.int64)
+        rows = np.searchsorted(self.vendor_ids, vendor_ids)
+        found = rows < len(self.vendor_ids)
+        found[found] = self.vendor_ids[rows[found]] == vendor_ids[found]
+        return rows[found]
+
+    def recommend(self, vendor_ids, limit):
+        """Vendor pks most similar to the vendors in `vendor_ids` (excluding them), best first."""
+        seen = self.rows(vendor_ids)
+        candidates = self.neighbours[seen].ravel()
+        weights = self.weights[seen].ravel()
+        valid = candidates >= 0
+        rows, inverse = np.unique(candidates[valid], return_inverse=True)
+        scores = np.bincount(inverse, weights=weights[valid]) if len(rows) else np.zeros(0)
+        new = ~np.isin(rows, seen)
+        rows, scores = rows[new], scores[new]
+        picked = list(rows[np.lexsort((rows, -scores))[:limit]])
+        # Top up with the most popular vendors (cold start, or too little overlap)
+        for row in self.popular:
+            if len(picked) >= limit:
+                break
+            if row not in picked and row not in seen:
+                picked.append(row)
+        return [int(self.vendor_ids[row]) for row in picked]
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def load_model():
+    """This process's memory-mapped model, reloaded when a new version is published (None before training)."""
+    global _model
+    directory = model_dir()
+    try:
+        version = (directory / 'CURRENT').read_text().strip()
+    except FileNotFoundError:
+        return None
+    if _model is None or _model.version != version:
+        with _model_lock:
+            if _model is None or _model.version != version:
+                _model = RecommenderModel(directory / version, version)
+    return _model
+
+
+def recommended_vendor_ids(seen_vendor_ids, limit=4):
+    model = load_model()
+    return model.recommend(seen_vendor_ids, limit) if model is not None else []
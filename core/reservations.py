@@ -0,0 +1,239 @@
+import re
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import rollups
+from .models import Booking, BookingSlot
+
+# Booking capacity.
+#
+# Bookings are grouped into slots of BOOKING_SLOT_MINUTES per vendor and date. A BookingSlot row
+# (created on first use with the vendor's seats_per_slot) counts the seats held by its pending
+# and confirmed bookings. Taking seats is a single conditional UPDATE
+#     UPDATE ... SET reserved = reserved + n WHERE <slot> AND capacity >= reserved + n
+# so concurrent requests for the same slot queue on that one row lock and the loser sees zero
+# rows updated instead of overbooking; requests for other slots or vendors never wait.
+#
+# Submissions can carry a client idempotency key (a hidden form field, or the Idempotency-Key
+# header on the test API). The booking stores it under a (tourist, key) unique constraint, and
+# the resulting booking id is cached for IDEMPOTENCY_CACHE_TIMEOUT seconds, so a double click or
+# network retry is answered from the cache without touching the booking table; a replay that
+# misses the cache is stopped by the constraint and answered with the original booking.
+
+HOLDING_STATUSES = ('pending', 'confirmed')
+IDEMPOTENCY_KEY_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+class SlotFull(Exception):
+    """The requested slot does not have enough seats left."""
+
+    def __init__(self, remaining):
+        super().__init__(f"Only {remaining} seats left in this slot")
+        self.remaining = remaining
+
+
+def slot_start(booking_time):
+    minutes = getattr(settings, 'BOOKING_SLOT_MINUTES', 30)
+    total = booking_time.hour * 60 + booking_time.minute
+    total -= total % minutes
+    return time(total // 60, total % 60)
+
+
+def opening_slots():
+    """Slot start times within BOOKING_OPENING_HOURS."""
+    hours = getattr(settings, 'BOOKING_OPENING_HOURS', ('10:00', '22:00'))
+    opens, closes = (datetime.strptime(value, '%H:%M') for value in hours)
+    step = timedelta(minutes=getattr(settings, 'BOOKING_SLOT_MINUTES', 30))
+    slots = []
+    while opens < closes:
+        slots.append(opens.time())
+        opens += step
+    return slots
+
+
+def _slot(vendor_id, booking_date, booking_time):
+    return BookingSlot.objects.filter(vendor_id=vendor_id, date=booking_date, start_time=slot_start(booking_time))
+
+
+def _hold(vendor, booking_date, booking_time, people):
+    BookingSlot.objects.bulk_create([BookingSlot(
+        vendor=vendor, date=booking_date, start_time=slot_start(booking_time), capacity=vendor.seats_per_slot,
+    )], ignore_conflicts=True)
+    slot = _slot(vendor.pk, booking_date, booking_time)
+    if not slot.filter(capacity__gte=F('reserved') + people).update(reserved=F('reserved') + people):
+        current = slot.first()
+        raise SlotFull(current.remaining if current else 0)
+
+
+def hold_in_order(vendor, booking_date, start_time, party_sizes):
+    """
+    Take seats for as many of `party_sizes` as fit, first come first served, with one UPDATE of
+    the slot row. Returns the seats left when each party's turn came; a party larger than that
+    was not seated. Call inside a transaction.
+    """
+    BookingSlot.objects.bulk_create([BookingSlot(
+        vendor=vendor, date=booking_date, start_time=start_time, capacity=vendor.seats_per_slot,
+    )], ignore_conflicts=True)
+    slot = BookingSlot.objects.filter(vendor=vendor, date=booking_date, start_time=start_time)
+    while True:
+        current = slot.select_for_update().get()
+        remaining, left = current.remaining, []
+        for people in party_sizes:
+            left.append(remaining)
+            remaining -= people if people <= remaining else 0
+        taken = current.remaining - remaining
+        # Conditional like _hold(), so seats taken since the read (without row locks) force a retry
+        if not taken or slot.filter(capacity__gte=F('reserved') + taken).update(reserved=F('reserved') + taken):
+            return left
+
+
+def _release(vendor_id, booking_date, booking_time, people):
+    _slot(vendor_id, booking_date, booking_time).filter(reserved__gte=people).update(
+        reserved=F('reserved') - people
+    )
+
+
+def stored_hold(booking_id):
+    """(vendor_id, booking_date, booking_time, people) of the stored booking if it holds seats, else None."""
+    return Booking.objects.filter(pk=booking_id, status__in=HOLDING_STATUSES).values_list(
+        'vendor_id', 'booking_date', 'booking_time', 'number_of_people'
+    ).first()
+
+
+def clean_idempotency_key(value):
+    """The key if it is usable (1-64 letters, digits, '-' or '_'), else None."""
+    return value if value and IDEMPOTENCY_KEY_RE.match(value) else None
+
+
+def _idempotency_cache_key(tourist_id, key):
+    return f'booking:idempotency:{tourist_id}:{key}'
+
+
+def replayed_booking_id(tourist_id, key):
+    """Id of the booking recently created with this idempotency key (from the cache only), or None."""
+    return cache.get(_idempotency_cache_key(tourist_id, key)) if key else None
+
+
+def _remember(booking):
+    if booking.idempotency_key:
+        key = _idempotency_cache_key(booking.tourist_id, booking.idempotency_key)
+        timeout = getattr(settings, 'IDEMPOTENCY_CACHE_TIMEOUT', 600)
+        transaction.on_commit(lambda: cache.set(key, booking.pk, timeout))
+
+
+def reserve(booking):
+    """
+    Save a new booking if its slot has room; raises SlotFull (saving nothing) otherwise. A booking
+    whose idempotency key was already used by the tourist is not saved; the original is returned.
+    """
+    try:
+        with transaction.atomic():
+            _hold(booking.vendor, booking.booking_date, booking.booking_time, booking.number_of_people)
+            booking.save()
+    except IntegrityError:
+        original = booking.idempotency_key and Booking.objects.filter(
+            tourist_id=booking.tourist_id, idempotency_key=booking.idempotency_key
+        ).first()
+        if not original:
+            raise
+        booking = original  # the seats taken above were rolled back with the insert
+    _remember(booking)
+    return booking
+
+
+def rebook(booking):
+    """Save changes to an existing booking's date, time or party size, moving its seats."""
+    with transaction.atomic():
+        stored = Booking.objects.select_for_update().get(pk=booking.pk)
+        if stored.status in HOLDING_STATUSES:
+            _release(stored.vendor_id, stored.booking_date, stored.booking_time, stored.number_of_people)
+            _hold(booking.vendor, booking.booking_date, booking.booking_time, booking.number_of_people)
+        booking.save()
+    return booking
+
+
+def set_status(booking, status):
+    """
+    Move `booking` to `status`, releasing its seats when it stops holding them. Returns False,
+    changing nothing, if the booking's status changed since it was loaded (e.g. a double click).
+    """
+    with transaction.atomic():
+        current = Booking.objects.select_for_update().filter(pk=booking.pk).values_list('status', flat=True).first()
+        if current != booking.status:
+            return False
+        if current in HOLDING_STATUSES and status not in HOLDING_STATUSES:
+            _release(booking.vendor_id, booking.booking_date, booking.booking_time, booking.number_of_people)
+        booking.status = status
+        booking.save(update_fields=['status'])
+    return True
+
+
+def bulk_set_status(vendor, booking_ids, status):
+    """
+    Move the vendor's pending bookings among `booking_ids` to `status` with one UPDATE, releasing
+    their seats (one UPDATE per slot) when `status` does not hold seats. Returns {id: outcome},
+    the outcome being `status`, 'unchanged' (no longer pending) or 'not_found'.
+    """
+    booking_ids = set(booking_ids)
+    with transaction.atomic():
+        rows = list(Booking.objects.select_for_update().filter(vendor=vendor, pk__in=booking_ids).values_list(
+            'pk', 'status', 'booking_date', 'booking_time', 'number_of_people', 'created_at'
+        ))
+        moving = [row for row in rows if row[1] == 'pending']
+        if moving:
+            Booking.objects.filter(pk__in=[row[0] for row in moving], status='pending').update(status=status)
+            # A queryset update sends no signals; move the dashboard counts here
+            rollups.move_all([
+                (rollups.booking_keys(created_at, 'pending', vendor.pk, booking_date, booking_time, people),
+                 rollups.booking_keys(created_at, status, vendor.pk, booking_date, booking_time, people))
+                for _, _, booking_date, booking_time, people, created_at in moving
+            ])
+        if status not in HOLDING_STATUSES:
+            freed = defaultdict(int)
+            for _, _, booking_date, booking_time, people, _ in moving:
+                freed[(booking_date, slot_start(booking_time))] += people
+            for (booking_date, start_time), people in sorted(freed.items()):
+                BookingSlot.objects.filter(
+                    vendor=vendor, date=booking_date, start_time=start_time, reserved__gte=people
+                ).update(reserved=F('reserved') - people)
+    outcomes = dict.fromkeys(booking_ids, 'not_found')
+    outcomes.update((pk, status if current == 'pending' else 'unchanged') for pk, current, *_ in rows)
+    return outcomes
+
+
+def apply_vendor_capacity(vendor):
+    """Give the vendor's upcoming slots its current seats_per_slot."""
+    BookingSlot.objects.filter(vendor=vendor, date__gte=timezone.localdate()).exclude(
+        capacity=vendor.seats_per_slot
+    ).update(capacity=vendor.seats_per_slot)
+
+
+def availability(vendor, start, end):
+    """
+    [(date, [(slot start, capacity, remaining), ...]), ...] for each day from `start` to `end`,
+    read from the vendor's BookingSlot rows in one range query; slots nobody booked yet have
+    the vendor's full seats_per_slot.
+    """
+    booked = defaultdict(dict)
+    for slot in BookingSlot.objects.filter(vendor=vendor, date__range=(start, end)):
+        booked[slot.date][slot.start_time] = slot
+    opening = opening_slots()
+    days = []
+    day = start
+    while day <= end:
+        slots = []
+        for start_time in sorted(set(opening) | set(booked[day])):
+            slot = booked[day].get(start_time)
+            if slot is None:
+                slots.append((start_time, vendor.seats_per_slot, vendor.seats_per_slot))
+            else:
+                slots.append((start_time, slot.capacity, slot.remaining))
+        days.append((day, slots))
+        day += timedelta(days=1)
+    return days
@@ -0,0 +1,149 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import ExtractHour, TruncDate
+from django.utils import timezone
+
+from .models import Booking, DailyStat, Review, VendorDailyStat
+
+# Daily statistics rollups.
+#
+# DailyStat (AdminDashboardView) holds one count per (day, metric):
+#   signups:tourist / signups:vendor / signups:other  -- users by date_joined and role
+#   reviews:comment / reviews:no_comment              -- reviews by created_at
+#   bookings:<status>                                 -- bookings by created_at and current status
+# VendorDailyStat (VendorAnalyticsView) holds one count per (vendor, day, metric):
+#   bookings:<status>, party:<people>, hour:<0-23>    -- bookings by booking_date
+#   rating:<1-5>                                      -- reviews by created_at
+# Every row is counted under a few keys. Saves and deletes move a row's counts from its old keys
+# to its new ones (see the signals); bulk writes (reservations.bulk_set_status, the booking
+# queue) call move_all() themselves. rebuild() recomputes days from the fact tables, for the
+# initial backfill and as a periodic catch-up.
+
+User = get_user_model()
+
+
+def user_metric(is_tourist, is_vendor):
+    return 'signups:tourist' if is_tourist else 'signups:vendor' if is_vendor else 'signups:other'
+
+
+def review_metric(comment):
+    return 'reviews:comment' if comment else 'reviews:no_comment'
+
+
+def booking_metric(status):
+    return f'bookings:{status}'
+
+
+def _user_keys(date_joined, is_tourist, is_vendor):
+    return [(DailyStat, (timezone.localdate(date_joined), user_metric(is_tourist, is_vendor)))]
+
+
+def _review_keys(created_at, comment, vendor_id, rating):
+    day = timezone.localdate(created_at)
+    return [(DailyStat, (day, review_metric(comment))), (VendorDailyStat, (vendor_id, day, f'rating:{rating}'))]
+
+
+def booking_keys(created_at, status, vendor_id, booking_date, booking_time, number_of_people):
+    return [
+        (DailyStat, (timezone.localdate(created_at), booking_metric(status))),
+        (VendorDailyStat, (vendor_id, booking_date, booking_metric(status))),
+        (VendorDailyStat, (vendor_id, booking_date, f'party:{number_of_people}')),
+        (VendorDailyStat, (vendor_id, booking_date, f'hour:{booking_time.hour}')),
+    ]
+
+
+# The fields each tracked model's keys are computed from, and the function computing them
+TRACKED = {
+    User: (('date_joined', 'is_tourist', 'is_vendor'), _user_keys),
+    Review: (('created_at', 'comment', 'vendor_id', 'rating'), _review_keys),
+    Booking: (('created_at', 'status', 'vendor_id', 'booking_date', 'booking_time', 'number_of_people'), booking_keys),
+}
+KEY_FIELDS = {DailyStat: ('day', 'metric'), VendorDailyStat: ('vendor_id', 'day', 'metric')}
+
+
+def keys_of(instance):
+    """The keys `instance` is counted under, as it is in memory (values as they will be stored)."""
+    fields, keys = TRACKED[type(instance)]
+    meta = instance._meta
+    return keys(*(meta.get_field(field).to_python(getattr(instance, field)) for field in fields))
+
+
+def stored_keys(model, pk):
+    """The keys the stored row `pk` is counted under ([] if there is none)."""
+    fields, keys = TRACKED[model]
+    row = model.objects.filter(pk=pk).values_list(*fields).first()
+    return keys(*row) if row else []
+
+
+def move_all(moves):
+    """Apply [(old keys, new keys), ...]; one UPDATE per key whose count changes."""
+    changes = Counter()
+    for old, new in moves:
+        changes.subtract(old)
+        changes.update(new)
+    # A removal with no row to take from (e.g. its vendor's rows are being cascade-deleted) is dropped
+    missing = {key: delta for key, delta in _add({key: delta for key, delta in changes.items() if delta}).items()
+               if delta > 0}
+    if missing:
+        # First count under these keys: create the rows empty, then add to them (safe under concurrency)
+        for model, fields in KEY_FIELDS.items():
+            rows = [model(**dict(zip(fields, key))) for key_model, key in missing if key_model is model]
+            if rows:
+                model.objects.bulk_create(rows, ignore_conflicts=True)
+        _add(missing)
+
+
+def move(old, new):
+    move_all([(old, new)])
+
+
+def _add(changes):
+    """Add each delta to its row with F(); returns the changes whose row does not exist yet."""
+    missing = {}
+    for (model, key), delta in sorted(changes.items(), key=lambda item: (item[0][0].__name__, item[0][1])):
+        if not model.objects.filter(**dict(zip(KEY_FIELDS[model], key))).update(count=F('count') + delta):
+            missing[(model, key)] = delta
+    return missing
+
+
+def _fact_counts(start):
+    counts = Counter()
+    users = User.objects.annotate(day=TruncDate('date_joined'))
+    reviews = Review.objects.annotate(day=TruncDate('created_at'))
+    bookings = Booking.objects.annotate(day=TruncDate('created_at'))
+    visits = Booking.objects.annotate(day=F('booking_date'), hour=ExtractHour('booking_time'))
+    if start is not None:
+        users, reviews, bookings, visits = (qs.filter(day__gte=start) for qs in (users, reviews, bookings, visits))
+
+    for row in users.values('day', 'is_tourist', 'is_vendor').annotate(n=Count('id')).order_by():
+        counts[(DailyStat, (row['day'], user_metric(row['is_tourist'], row['is_vendor'])))] += row['n']
+    has_comment = Q(comment__isnull=False) & ~Q(comment='')
+    for row in reviews.values('day').annotate(n=Count('id'), commented=Count('id', filter=has_comment)).order_by():
+        counts[(DailyStat, (row['day'], review_metric(True)))] += row['commented']
+        counts[(DailyStat, (row['day'], review_metric(False)))] += row['n'] - row['commented']
+    for row in reviews.values('vendor_id', 'day', 'rating').annotate(n=Count('id')).order_by():
+        counts[(VendorDailyStat, (row['vendor_id'], row['day'], f"rating:{row['rating']}"))] += row['n']
+    for row in bookings.values('day', 'status').annotate(n=Count('id')).order_by():
+        counts[(DailyStat, (row['day'], booking_metric(row['status'])))] += row['n']
+    for dimension, metric in (('status', booking_metric), ('number_of_people', 'party:{}'.format),
+                              ('hour', 'hour:{}'.format)):
+        for row in visits.values('vendor_id', 'day', dimension).annotate(n=Count('id')).order_by():
+            counts[(VendorDailyStat, (row['vendor_id'], row['day'], metric(row[dimension])))] += row['n']
+    return counts
+
+
+def rebuild(start=None, batch_size=1000):
+    """Recompute the rollups from `start` (a date; None for all history); returns the number of rows."""
+    counts = {key: count for key, count in _fact_counts(start).items() if count}
+    with transaction.atomic():
+        for model, fields in KEY_FIELDS.items():
+            stale = model.objects.all() if start is None else model.objects.filter(day__gte=start)
+            stale.delete()
+            model.objects.bulk_create([
+                model(count=count, **dict(zip(fields, key)))
+                for (key_model, key), count in counts.items() if key_model is model
+            ], batch_size=batch_size)
+    return len(counts)
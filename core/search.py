@@ -0,0 +1,289 @@
+import math
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import VendorProfile, VendorSearchDocument
+from .pagination import KeysetPaginator, decode_cursor, encode_cursor
+
+# Full-text search over VendorSearchDocument.
+#   MySQL:  FULLTEXT index on core_vendorsearchdocument.document (migration 0015)
+#   SQLite: FTS5 table core_vendorsearch_fts kept in sync by triggers (migration 0015)
+#   Other backends fall back to icontains on the single document column.
+
+FTS_TABLE = 'core_vendorsearch_fts'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+INDEXED_VENDOR_FIELDS = ('business_name', 'description', 'cuisine', 'category', 'location_text')
+
+
+def build_document(vendor, food_items=None):
+    if food_items is None:
+        food_items = vendor.food_items.all()
+    parts = [getattr(vendor, field) for field in INDEXED_VENDOR_FIELDS]
+    for item in food_items:
+        parts.append(item.name)
+        parts.append(item.description)
+    return '\n'.join(p for p in parts if p)
+
+
+def update_vendor_document(vendor_id):
+    vendor = VendorProfile.objects.filter(pk=vendor_id).first()
+    if vendor is None:
+        delete_vendor_document(vendor_id)
+        return
+    VendorSearchDocument.objects.update_or_create(
+        vendor_id=vendor_id, defaults={'document': build_document(vendor)}
+    )
+
+
+def delete_vendor_document(vendor_id):
+    VendorSearchDocument.objects.filter(vendor_id=vendor_id).delete()
+
+
+def rebuild_search_index(batch_size=500):
+    VendorSearchDocument.objects.all().delete()
+    vendors = VendorProfile.objects.prefetch_related('food_items').order_by('pk')
+    batch = []
+    count = 0
+    for vendor in vendors.iterator(chunk_size=batch_size):
+        batch.append(VendorSearchDocument(
+            vendor_id=vendor.pk,
+            document=build_document(vendor, vendor.food_items.all()),
+        ))
+        if len(batch) >= batch_size:
+            VendorSearchDocument.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        VendorSearchDocument.objects.bulk_create(batch)
+        count += len(batch)
+    return count
+
+
+def tokenize(query):
+    return TOKEN_RE.findall((query or '').lower())
+
+
+def _match_condition(terms):
+    """Q on VendorProfile for vendors whose document matches every term (prefix match), uncapped."""
+    if connection.vendor == 'mysql':
+        match = ' '.join('+%s*' % t for t in terms)
+        return Q(pk__in=RawSQL(
+            'SELECT vendor_id FROM core_vendorsearchdocument WHERE MATCH(document) AGAINST (%s IN BOOLEAN MODE)',
+            [match],
+        ))
+    if connection.vendor == 'sqlite':
+        match = ' '.join('"%s"*' % t for t in terms)
+        return Q(pk__in=RawSQL('SELECT rowid FROM ' + FTS_TABLE + ' WHERE ' + FTS_TABLE + ' MATCH %s', [match]))
+    docs = VendorSearchDocument.objects.all()
+    for t in terms:
+        docs = docs.filter(document__icontains=t)
+    return Q(pk__in=docs.values('vendor_id'))
+
+
+def _relevance(terms):
+    """(expression scoring each matching VendorProfile row, best first when descending) or None."""
+    if connection.vendor == 'mysql':
+        match = ' '.join('+%s*' % t for t in terms)
+        return RawSQL(
+            'SELECT MATCH(document) AGAINST (%s IN BOOLEAN MODE) FROM core_vendorsearchdocument '
+            'WHERE vendor_id = core_vendorprofile.id', [match], output_field=FloatField(),
+        ), True
+    if connection.vendor == 'sqlite':
+        match = ' '.join('"%s"*' % t for t in terms)
+        return RawSQL(
+            'SELECT rank FROM ' + FTS_TABLE + ' WHERE ' + FTS_TABLE + ' MATCH %s AND rowid = core_vendorprofile.id',
+            [match], output_field=FloatField(),
+        ), False
+    return None
+
+
+def text_match(query):
+    """Q on VendorProfile for every vendor matching `query`, or None if it has no terms."""
+    terms = tokenize(query)
+    return _match_condition(terms) if terms else None
+
+
+def rank(matching, query, limit=None):
+    """Ids of `matching` (vendors filtered on text_match(query)), best match first, at most `limit`."""
+    terms = tokenize(query)
+    if not terms:
+        return []
+    if limit is None:
+        limit = max_results()
+    relevance = _relevance(terms)
+    if relevance is None:
+        ordered = matching.order_by('pk')
+    else:
+        score, descending = relevance
+        ordered = matching.annotate(relevance=score).order_by('-relevance' if descending else 'relevance', 'pk')
+    return list(ordered.values_list('pk', flat=True)[:limit])
+
+
+def ranked_vendor_ids(query, limit=None):
+    """Return vendor ids matching every term of `query` (prefix match), best match first."""
+    condition = text_match(query)
+    return rank(VendorProfile.objects.filter(condition), query, limit) if condition else []
+
+
+def max_results():
+    """Cap on the vendors ranked by relevance (best-match order, fuzzy matching) per search."""
+    return getattr(settings, 'SEARCH_MAX_RESULTS', 500)
+
+
+class SearchFilters(namedtuple('SearchFilters', 'query cuisine price rating sort fuzzy lat lng radius')):
+    """Normalized SearchResultsView parameters; equal searches give equal tuples."""
+
+    @classmethod
+    def from_params(cls, params):
+        query = ' '.join(tokenize(params.get('search', '')))
+        cuisines = {value.lower(): value for value, _ in VendorProfile.CUISINE_CHOICES}
+        cuisine = params.get('cuisine') or ''
+        cuisine = cuisines.get(cuisine.lower(), cuisine)
+        sort = params.get('sort') or ''
+        if sort not in SORT_ORDERINGS and sort != 'distance':
+            sort = ''
+        # Rounded to ~100m so nearby users share cache entries
+        lat, lng = _float_or_none(params.get('lat'), 3), _float_or_none(params.get('lng'), 3)
+        if lat is None or lng is None or not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            lat = lng = None
+            if sort == 'distance':
+                sort = ''
+        radius = _float_or_none(params.get('radius'), 1) if lat is not None else None
+        rating = _int_or_none(params.get('rating'))
+        if sort == 'top' and rating is None:
+            rating = 4  # sort=top is a shortcut for 4+ stars
+        fuzzy = bool(query) and params.get('fuzzy') in ('1', 'true', 'on')
+        return cls(query, cuisine, _int_or_none(params.get('price')), rating, sort, fuzzy, lat, lng, radius)
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None  # Fail silently on non-numeric filter input
+
+
+def _float_or_none(value, digits):
+    try:
+        value = round(float(value), digits)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def filtered_vendors(filters):
+    """Return (queryset, ranked_ids) for `filters`; ranked_ids is only set for fuzzy text queries."""
+    # average_rating and min_price are stored, indexed columns (no joins needed)
+    vendors = VendorProfile.objects.with_cover_item()
+    ranked_ids = []
+    if filters.query:
+        if filters.fuzzy:
+            from . import fuzzy  # core.fuzzy imports this module
+            ranked_ids = fuzzy.ranked_vendor_ids(filters.query)
+            vendors = vendors.filter(pk__in=ranked_ids)
+        else:
+            # Every full-text match, so sorted pages and facet counts miss none of them
+            vendors = vendors.filter(text_match(filters.query))
+    if filters.cuisine:
+        vendors = vendors.filter(cuisine=filters.cuisine)
+    if filters.price is not None:
+        vendors = vendors.filter(min_price__lte=filters.price)
+    if filters.rating is not None:
+        vendors = vendors.filter(average_rating__gte=filters.rating)
+    return vendors, ranked_ids
+
+
+def search_page(filters, cursor=None, page_size=None):
+    """One keyset page of vendors for `filters`: (vendors, next_cursor)."""
+    page_size = page_size or page_size_from(None)
+    vendors, ranked_ids = filtered_vendors(filters)
+    if filters.sort == 'distance':
+        from . import geo  # keeps NumPy out of this module's import path
+        nearest = geo.nearby_vendors(filters.lat, filters.lng, radius_km=filters.radius, vendors=vendors)
+        return ranked_page(vendors, [pk for pk, _ in nearest], cursor, page_size)
+    if filters.query and not filters.sort:
+        if not filters.fuzzy:
+            # Ranked after the cuisine/price/rating filters, so the cap only trims the worst of those
+            ranked_ids = rank(vendors, filters.query)
+        return ranked_page(vendors, ranked_ids, cursor, page_size)
+    ordering = SORT_ORDERINGS.get(filters.sort, SORT_ORDERINGS['name'])
+    return KeysetPaginator(ordering, page_size).page(vendors, cursor)
+
+
+# Sidebar facet values, matching the options in search/results.html
+PRICE_BUCKETS = (10, 20)      # "Under $N": min_price <= N
+RATING_BUCKETS = (5, 4, 3)    # "N+ stars": average_rating >= N
+
+
+def facet_counts(filters):
+    """Vendor counts per cuisine, price bucket and rating bucket for the text query, in one query.
+
+    'capped' is set when a fuzzy text query matched max_results() vendors or more, so only the
+    best max_results() matches are listed and counted (full-text matches are never capped here).
+    """
+    vendors, ranked_ids = filtered_vendors(SearchFilters(filters.query, '', None, None, '', filters.fuzzy, None, None, None))
+    aggregates = {f'cuisine_{value}': Count('pk', filter=Q(cuisine=value)) for value, _ in VendorProfile.CUISINE_CHOICES}
+    aggregates.update({f'price_{n}': Count('pk', filter=Q(min_price__lte=n)) for n in PRICE_BUCKETS})
+    aggregates.update({f'rating_{n}': Count('pk', filter=Q(average_rating__gte=n)) for n in RATING_BUCKETS})
+    aggregates['total'] = Count('pk')
+    counts = vendors.order_by().aggregate(**aggregates)
+    return {
+        'total': counts['total'],
+        'capped': filters.fuzzy and len(ranked_ids) >= max_results(),
+        'cuisine': {value: counts[f'cuisine_{value}'] for value, _ in VendorProfile.CUISINE_CHOICES},
+        'price': {str(n): counts[f'price_{n}'] for n in PRICE_BUCKETS},
+        'rating': {str(n): counts[f'rating_{n}'] for n in RATING_BUCKETS},
+    }
+
+
+# Result ordering for SearchResultsView: (field, descending, nullable), unique 'pk' last
+SORT_ORDERINGS = {
+    'name': [('business_name', False, False), ('pk', False, False)],
+    'rating': [('average_rating', True, False), ('pk', False, False)],
+    'top': [('average_rating', True, False), ('pk', False, False)],
+    'price': [('min_price', False, True), ('pk', False, False)],
+}
+
+
+def page_size_from(value):
+    default = getattr(settings, 'SEARCH_PAGE_SIZE', 20)
+    maximum = getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 50)
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
+
+
+def ranked_page(vendors, ranked_ids, cursor, page_size):
+    """Keyset page over a relevance-ordered id list; the cursor is [rank position, pk]."""
+    values = decode_cursor(cursor)
+    start = 0
+    if values and len(values) == 2:
+        position, pk = values
+        if not (isinstance(position, int) and 0 <= position < len(ranked_ids) and ranked_ids[position] == pk):
+            # The ranking moved since the cursor was issued; resume after the same vendor
+            position = ranked_ids.index(pk) if pk in ranked_ids else -1
+        start = position + 1
+    candidates = ranked_ids[start:]
+    matching = set(vendors.filter(pk__in=candidates).values_list('pk', flat=True))
+
+    page_ids, positions = [], []
+    for position, pk in enumerate(candidates, start):
+        if pk in matching:
+            page_ids.append(pk)
+            positions.append(position)
+            if len(page_ids) > page_size:
+                break
+    next_cursor = None
+    if len(page_ids) > page_size:
+        page_ids = page_ids[:page_size]
+        last = positions[page_size - 1]
+        next_cursor = encode_cursor([last, ranked_ids[last]])
+
+    by_pk = vendors.in_bulk(page_ids)
+    return [by_pk[pk] for pk in page_ids if pk in by_pk], next_cursor
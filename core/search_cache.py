@@ -0,0 +1,105 @@
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import VendorProfile
+from .search import SearchFilters, facet_counts, search_page
+
+# Cached SearchResultsView pages.
+#
+# An entry is keyed on the normalized filters (query, cuisine, price, rating, sort, location), cursor and page size
+# and stores the ordered vendor ids; a hit loads those rows by primary key (one query), so the
+# cards always show current data. An entry stays valid while the version stamps it was built
+# against are unchanged:
+#   * one stamp per listed vendor   -- any change to that vendor, its menu or its reviews
+#   * one stamp per cuisine (and '*' for all cuisines) per dimension the search depends on:
+#       members -- vendors added/removed/renamed/recategorized (every search)
+#       text    -- searchable text or menu changed (searches with a text query)
+#       rating  -- reviews changed (rating filter or rating sort)
+#       price   -- menu prices changed (price filter or price sort)
+# so a new Thai review only invalidates rating-dependent Thai/all-cuisine pages and the pages
+# listing that vendor, never the whole cache.
+
+KEY_PREFIX = 'search'
+ALL_CUISINES = '*'
+
+
+def _vendor_stamp_key(vendor_id):
+    return f'{KEY_PREFIX}:vendor:{vendor_id}'
+
+
+def _dimension_stamp_key(cuisine, dimension):
+    return f'{KEY_PREFIX}:{dimension}:{cuisine or ALL_CUISINES}'
+
+
+def _page_key(filters, cursor, page_size):
+    raw = repr((tuple(filters), cursor or '', page_size))
+    return f'{KEY_PREFIX}:page:' + hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _dimensions(filters):
+    dimensions = ['members']
+    if filters.query:
+        dimensions.append('text')
+    if filters.rating is not None or filters.sort in ('rating', 'top'):
+        dimensions.append('rating')
+    if filters.price is not None or filters.sort == 'price':
+        dimensions.append('price')
+    return [_dimension_stamp_key(filters.cuisine, d) for d in dimensions]
+
+
+def _current_stamps(keys):
+    stamps = cache.get_many(keys)
+    missing = [key for key in keys if key not in stamps]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        stamps.update(cache.get_many(missing))
+    return stamps
+
+
+def bump(vendor_id, cuisine, *dimensions):
+    """Invalidate cached pages that list `vendor_id` or depend on `dimensions` of its cuisine."""
+    keys = [_vendor_stamp_key(vendor_id)]
+    for dimension in dimensions:
+        keys.append(_dimension_stamp_key(ALL_CUISINES, dimension))
+        if cuisine:
+            keys.append(_dimension_stamp_key(cuisine, dimension))
+    cache.set_many({key: uuid.uuid4().hex for key in keys}, None)
+
+
+def cached_search_page(filters, cursor, page_size):
+    """Same result as search.search_page(), served from the cache when still valid."""
+    key = _page_key(filters, cursor, page_size)
+    entry = cache.get(key)
+    if entry is not None and _current_stamps(list(entry['stamps'])) == entry['stamps']:
+        by_pk = VendorProfile.objects.with_cover_item().in_bulk(entry['ids'])
+        return [by_pk[pk] for pk in entry['ids'] if pk in by_pk], entry['next_cursor']
+
+    # Read the dimension stamps before querying so a concurrent change invalidates this entry
+    stamps = _current_stamps(_dimensions(filters))
+    vendors, next_cursor = search_page(filters, cursor, page_size)
+    stamps.update(_current_stamps([_vendor_stamp_key(v.pk) for v in vendors]))
+    cache.set(key, {
+        'ids': [v.pk for v in vendors],
+        'next_cursor': next_cursor,
+        'stamps': stamps,
+    }, getattr(settings, 'SEARCH_CACHE_TIMEOUT', 300))
+    return vendors, next_cursor
+
+
+def cached_facet_counts(filters):
+    """search.facet_counts() for the text query of `filters`, cached like result pages."""
+    base = SearchFilters(filters.query, '', None, None, '', filters.fuzzy, None, None, None)
+    key = f'{KEY_PREFIX}:facets:' + hashlib.sha1(repr(tuple(base)).encode()).hexdigest()
+    entry = cache.get(key)
+    if entry is not None and _current_stamps(list(entry['stamps'])) == entry['stamps']:
+        return entry['counts']
+
+    dimensions = ['members', 'rating', 'price'] + (['text'] if base.query else [])
+    stamps = _current_stamps([_dimension_stamp_key(ALL_CUISINES, d) for d in dimensions])
+    counts = facet_counts(base)
+    cache.set(key, {'counts': counts, 'stamps': stamps}, getattr(settings, 'SEARCH_CACHE_TIMEOUT', 300))
+    return counts
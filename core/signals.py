@@ -1,6 +1,8 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
 from django.dispatch import receiver
-from .models import CustomUser, VendorProfile, TouristProfile
+from .models import Booking, CustomUser, VendorProfile, TouristProfile, FoodItem, Review
+from . import autocomplete, fuzzy, map_clusters, reservations, rollups, search, search_cache
 
 # Automatically create profile upon user creation
 @receiver(post_save, sender=CustomUser)
@@ -17,8 +19,186 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 # Only save if profile already exists (prevents crash)
 @receiver(post_save, sender=CustomUser)
-def save_user_profile(sender, instance, **kwargs):
+def save_user_profile(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None:
+        return  # e.g. last_login on every login; the profile did not change
     if instance.is_vendor and hasattr(instance, 'vendor_profile'):
         instance.vendor_profile.save()
     elif instance.is_tourist and hasattr(instance, 'tourist_profile'):
         instance.tourist_profile.save()
+
+
+# Keep the full-text search document and fuzzy trigram index in sync with vendor and menu changes
+# (deleting a vendor cascades to its VendorSearchDocument)
+@receiver(post_save, sender=VendorProfile)
+def index_vendor(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is not None and not set(update_fields) & set(search.INDEXED_VENDOR_FIELDS):
+        return
+    search.update_vendor_document(instance.pk)
+    fuzzy.update_vendor_trigrams(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=FoodItem)
+def reindex_vendor_menu(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.update_vendor_document(instance.vendor_id)
+        fuzzy.update_vendor_trigrams(instance.vendor_id)
+
+
+# Invalidate cached search pages (see core/search_cache.py). Bump now for this transaction's
+# own reads and again on commit, after which other connections can see the change.
+def _bump_search_cache(vendor_id, cuisine, *dimensions):
+    search_cache.bump(vendor_id, cuisine, *dimensions)
+    transaction.on_commit(lambda: search_cache.bump(vendor_id, cuisine, *dimensions))
+
+
+def _vendor_cuisine(instance):
+    if instance.__class__.vendor.is_cached(instance):
+        return instance.vendor.cuisine
+    return VendorProfile.objects.filter(pk=instance.vendor_id).values_list('cuisine', flat=True).first()
+
+
+@receiver(post_save, sender=VendorProfile)
+def invalidate_vendor_searches(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw and (update_fields is None or set(update_fields) - set(VendorProfile.STATS_FIELDS)):
+        _bump_search_cache(instance.pk, instance.cuisine, 'members', 'text')
+
+
+@receiver(post_delete, sender=VendorProfile)
+def invalidate_deleted_vendor_searches(sender, instance, **kwargs):
+    _bump_search_cache(instance.pk, instance.cuisine, 'members')
+
+
+@receiver([post_save, post_delete], sender=FoodItem)
+def invalidate_menu_searches(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _bump_search_cache(instance.vendor_id, _vendor_cuisine(instance), 'text', 'price')
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_rating_searches(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _bump_search_cache(instance.vendor_id, _vendor_cuisine(instance), 'rating')
+
+
+# Keep this process's autocomplete index current (other processes rebuild on AUTOCOMPLETE_MAX_AGE)
+@receiver(post_save, sender=VendorProfile)
+def autocomplete_vendor_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: autocomplete.index.update(
+            autocomplete.VENDOR, instance.pk, instance.business_name))
+
+
+@receiver(post_delete, sender=VendorProfile)
+def autocomplete_vendor_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: autocomplete.index.update(autocomplete.VENDOR, instance.pk))
+
+
+@receiver(post_save, sender=FoodItem)
+def autocomplete_dish_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: autocomplete.index.update(
+            autocomplete.DISH, instance.pk, instance.name, instance.vendor_id))
+
+
+@receiver(post_delete, sender=FoodItem)
+def autocomplete_dish_deleted(sender, instance, **kwargs):
+    pk = instance.pk  # cleared on the instance once the delete finishes
+    transaction.on_commit(lambda: autocomplete.index.update(autocomplete.DISH, pk))
+
+
+# Keep the map marker clusters current: read the stored location before a save or delete, then
+# move the vendor between cells (the instance itself may be stale)
+def _stored_location(pk):
+    row = VendorProfile.objects.filter(pk=pk).values_list('latitude', 'longitude').first()
+    return map_clusters.location(*row) if row else None
+
+
+@receiver(pre_save, sender=VendorProfile)
+def remember_vendor_location(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if instance._state.adding:
+        instance._previous_location = None
+    elif update_fields is None or 'geohash' in update_fields:
+        instance._previous_location = _stored_location(instance.pk)
+
+
+@receiver(post_save, sender=VendorProfile)
+def move_vendor_marker(sender, instance, raw=False, **kwargs):
+    if not raw and '_previous_location' in instance.__dict__:
+        previous = instance.__dict__.pop('_previous_location')
+        map_clusters.move_vendor(previous, map_clusters.location(instance.latitude, instance.longitude))
+
+
+@receiver(pre_delete, sender=VendorProfile)
+def remember_deleted_vendor_location(sender, instance, **kwargs):
+    instance._previous_location = _stored_location(instance.pk)
+
+
+@receiver(post_delete, sender=VendorProfile)
+def remove_vendor_marker(sender, instance, **kwargs):
+    map_clusters.move_vendor(instance.__dict__.pop('_previous_location', None), None)
+
+
+# Upcoming booking slots follow changes to the vendor's seats_per_slot
+@receiver(post_save, sender=VendorProfile)
+def update_slot_capacity(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if not raw and not created and (update_fields is None or 'seats_per_slot' in update_fields):
+        reservations.apply_vendor_capacity(instance)
+
+
+# Deleted bookings (directly or by a tourist/vendor cascade) give their seats back
+@receiver(pre_delete, sender=Booking)
+def remember_deleted_booking_hold(sender, instance, **kwargs):
+    instance._previous_hold = reservations.stored_hold(instance.pk)
+
+
+@receiver(post_delete, sender=Booking)
+def release_deleted_booking_seats(sender, instance, **kwargs):
+    hold = instance.__dict__.pop('_previous_hold', None)
+    if hold:
+        reservations._release(*hold)
+
+
+# Daily rollups (core/rollups.py): read the keys the stored row is counted under before a save
+# or delete that can change them, then move its counts to the new keys
+def _rollup_fields(sender):
+    fields = rollups.TRACKED[sender][0]
+    return set(fields) | {field.removesuffix('_id') for field in fields}  # update_fields may name 'vendor'
+
+
+@receiver(pre_save, sender=CustomUser)
+@receiver(pre_save, sender=Review)
+@receiver(pre_save, sender=Booking)
+def remember_rollup_keys(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if instance._state.adding:
+        instance._previous_rollup = []
+    elif update_fields is None or _rollup_fields(sender) & set(update_fields):
+        instance._previous_rollup = rollups.stored_keys(sender, instance.pk)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_save, sender=Review)
+@receiver(post_save, sender=Booking)
+def move_rollup_counts(sender, instance, raw=False, **kwargs):
+    if not raw and '_previous_rollup' in instance.__dict__:
+        rollups.move(instance.__dict__.pop('_previous_rollup'), rollups.keys_of(instance))
+
+
+@receiver(pre_delete, sender=CustomUser)
+@receiver(pre_delete, sender=Review)
+@receiver(pre_delete, sender=Booking)
+def remember_deleted_rollup_keys(sender, instance, **kwargs):
+    instance._previous_rollup = rollups.stored_keys(sender, instance.pk)
+
+
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=Review)
+@receiver(post_delete, sender=Booking)
+def remove_rollup_counts(sender, instance, **kwargs):
+    rollups.move(instance.__dict__.pop('_previous_rollup', []), [])
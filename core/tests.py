@@ -1,14 +1,30 @@
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
-from core.models import VendorProfile, Booking
+from core import autocomplete, booking_queue, dashboard, exports, fuzzy, geo, map_clusters, recommendations, reservations, search
+from core.models import VendorProfile, Booking, BookingRequest, BookingSlot, DailyStat, VendorDailyStat, FoodItem, MapCluster, Review
+from django.core.management import call_command
+from django.utils import timezone
+from datetime import date, time as dt_time, timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipIf
+import json
+import tempfile
+import threading
 import time
 
+import numpy as np
+
 User = get_user_model()
 
 class SearchTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.client = Client()
 
     def test_search_thai_response_time(self):
@@ -20,6 +36,512 @@ class SearchTests(TestCase):
         self.assertLess(duration, 2.0, f"Search took too long: {duration:.2f}s")
 
 
+# TransactionTestCase: MySQL only updates FULLTEXT indexes on commit
+class SearchIndexTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.thai = VendorProfile.objects.create(
+            user=User.objects.create_user(username='thai', password='password'),
+            business_name="Bangkok Corner", description="Street food", cuisine="Thai",
+        )
+        self.ramen = VendorProfile.objects.create(
+            user=User.objects.create_user(username='ramen', password='password'),
+            business_name="Noodle Bar", description="Thai inspired broths", cuisine="Japanese",
+        )
+
+    def test_search_matches_cuisine_and_ranks_results(self):
+        response = self.client.get('/search/?search=thai')
+        results = list(response.context['vendor_results'])
+        self.assertEqual(set(results), {self.thai, self.ramen})
+
+    def test_index_follows_food_item_changes(self):
+        item = FoodItem.objects.create(vendor=self.ramen, name="Tonkotsu Ramen", price=12)
+        response = self.client.get('/search/?search=tonkotsu')
+        self.assertEqual(list(response.context['vendor_results']), [self.ramen])
+
+        item.delete()
+        response = self.client.get('/search/?search=tonkotsu')
+        self.assertEqual(list(response.context['vendor_results']), [])
+
+    def test_relevance_results_are_paginated(self):
+        first = self.client.get('/search/?search=thai&page_size=1')
+        second = self.client.get(first.context['next_page_url'])
+        results = list(first.context['vendor_results']) + list(second.context['vendor_results'])
+        self.assertEqual(set(results), {self.thai, self.ramen})
+        self.assertIsNone(second.context['next_page_url'])
+
+    def test_prefix_search(self):
+        response = self.client.get('/search/?search=bang')
+        self.assertEqual(list(response.context['vendor_results']), [self.thai])
+
+
+class VendorStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='stats', password='password'),
+            business_name="Stats Kitchen", cuisine="Local",
+        )
+        self.reviewer = User.objects.create_user(username='reviewer', password='password')
+
+    def test_min_price_follows_menu(self):
+        cheap = FoodItem.objects.create(vendor=self.vendor, name="Soup", price=4)
+        FoodItem.objects.create(vendor=self.vendor, name="Stew", price=9)
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.min_price, 4)
+
+        cheap.delete()
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.min_price, 9)
+
+    def test_rating_stats_follow_reviews(self):
+        Review.objects.create(user=self.reviewer, vendor=self.vendor, rating=5)
+        Review.objects.create(user=self.user_named('second'), vendor=self.vendor, rating=2)
+        self.vendor.refresh_from_db()
+        self.assertEqual((self.vendor.review_count, self.vendor.rating_sum), (2, 7))
+        self.assertEqual(self.vendor.average_rating, 3.5)
+
+    def test_profile_save_keeps_stats(self):
+        stale = VendorProfile.objects.get(pk=self.vendor.pk)
+        FoodItem.objects.create(vendor=self.vendor, name="Soup", price=4)
+        stale.description = "Updated"
+        stale.save()
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.min_price, 4)
+
+    def test_search_filters_on_stored_columns(self):
+        FoodItem.objects.create(vendor=self.vendor, name="Soup", price=15)
+        response = self.client.get('/search/?price=10')
+        self.assertEqual(list(response.context['vendor_results']), [])
+        response = self.client.get('/search/?price=20&cuisine=local')
+        self.assertEqual(list(response.context['vendor_results']), [self.vendor])
+
+    def test_rebuild_command_repairs_stats(self):
+        FoodItem.objects.create(vendor=self.vendor, name="Soup", price=4)
+        VendorProfile.objects.update(min_price=None, review_count=9)
+        call_command('rebuild_vendor_stats', stdout=StringIO())
+        self.vendor.refresh_from_db()
+        self.assertEqual((self.vendor.min_price, self.vendor.review_count), (4, 0))
+
+    def test_rating_edit_and_bulk_paths(self):
+        review = Review.objects.create(user=self.reviewer, vendor=self.vendor, rating=5)
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 3
+        review.save()
+        Review.objects.bulk_create([
+            Review(user=self.user_named('b1'), vendor=self.vendor, rating=4),
+            Review(user=self.user_named('b2'), vendor=self.vendor, rating=2),
+        ])
+        self.vendor.refresh_from_db()
+        self.assertEqual((self.vendor.review_count, self.vendor.rating_sum), (3, 9))
+        self.assertEqual(self.vendor.average_rating, 3.0)
+
+        Review.objects.filter(rating__lt=4).delete()
+        self.vendor.refresh_from_db()
+        self.assertEqual((self.vendor.review_count, self.vendor.rating_sum), (1, 4))
+        self.assertEqual(self.vendor.average_rating, 4.0)
+
+    def test_review_write_does_not_aggregate(self):
+        Review.objects.create(user=self.reviewer, vendor=self.vendor, rating=4)  # today's rollup rows exist
+        review = Review(user=self.reviewer, vendor=self.vendor, rating=4)
+        with self.assertNumQueries(4):  # INSERT review + UPDATE vendor counters + UPDATE two daily rollups
+            review.save()
+
+    def test_reconcile_command_repairs_drift(self):
+        Review.objects.create(user=self.reviewer, vendor=self.vendor, rating=5)
+        VendorProfile.objects.update(review_count=7, rating_sum=1)
+        out = StringIO()
+        call_command('reconcile_vendor_ratings', stdout=out)
+        self.vendor.refresh_from_db()
+        self.assertEqual((self.vendor.review_count, self.vendor.rating_sum), (1, 5))
+        self.assertIn("Repaired 1 drifted vendors.", out.getvalue())
+
+    def user_named(self, username):
+        return User.objects.create_user(username=username, password='password')
+
+
+class FuzzySearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.thai = VendorProfile.objects.create(
+            user=User.objects.create_user(username='fthai', password='password'),
+            business_name="Bangkok Corner", cuisine="Thai",
+        )
+        self.ramen = VendorProfile.objects.create(
+            user=User.objects.create_user(username='framen', password='password'),
+            business_name="Noodle Bar", cuisine="Japanese",
+        )
+        FoodItem.objects.create(vendor=self.ramen, name="Tonkotsu Ramen", price=12)
+
+    def test_typos_match_with_fuzzy_flag(self):
+        self.assertEqual(fuzzy.ranked_vendor_ids('thia'), [self.thai.pk])
+        response = self.client.get('/search/?search=ramn&fuzzy=1')
+        self.assertEqual(list(response.context['vendor_results']), [self.ramen])
+
+    def test_index_follows_menu_changes(self):
+        FoodItem.objects.filter(vendor=self.ramen).delete()
+        self.assertEqual(fuzzy.ranked_vendor_ids('ramn'), [])
+
+    def test_benchmark_command_runs(self):
+        out = StringIO()
+        call_command('benchmark_search', 'thia', '--repeat', '1', stdout=out)
+        self.assertIn('fuzzy', out.getvalue())
+
+
+class SearchPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        for i in range(7):
+            vendor = VendorProfile.objects.create(
+                user=User.objects.create_user(username=f'page{i}', password='password'),
+                business_name=f"Vendor {i % 3}", cuisine="Thai",
+            )
+            if i % 2:
+                FoodItem.objects.create(vendor=vendor, name="Dish", price=10 - i)
+
+    def collect(self, url):
+        seen = []
+        while url:
+            response = self.client.get(url)
+            page = list(response.context['vendor_results'])
+            self.assertLessEqual(len(page), 3)
+            seen.extend(page)
+            url = response.context['next_page_url']
+        return seen
+
+    def test_pages_are_bounded_and_cover_every_vendor_once(self):
+        seen = self.collect('/search/?page_size=3')
+        expected = list(VendorProfile.objects.order_by('business_name', 'id'))
+        self.assertEqual(seen, expected)
+
+    def test_price_sort_puts_vendors_without_menu_last(self):
+        seen = self.collect('/search/?page_size=3&sort=price')
+        prices = [v.min_price for v in seen]
+        self.assertEqual(prices[:3], sorted(prices[:3]))
+        self.assertEqual(prices[3:], [None] * 4)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_facet_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            facets = search.facet_counts(search.SearchFilters.from_params({}))
+        self.assertEqual(facets['total'], 7)
+        self.assertEqual(facets['cuisine']['Thai'], 7)
+        self.assertEqual(facets['cuisine']['Indian'], 0)
+        self.assertEqual(facets['price'], {'10': 3, '20': 3})  # vendors 1, 3, 5 have a dish
+        self.assertEqual(facets['rating']['4'], 0)
+
+    def test_invalid_cursor_starts_over(self):
+        response = self.client.get('/search/?page_size=3&cursor=not-a-cursor')
+        self.assertEqual(len(response.context['vendor_results']), 3)
+
+    @override_settings(SEARCH_MAX_RESULTS=2)
+    def test_result_cap_never_hides_filtered_or_sorted_matches(self):
+        last = VendorProfile.objects.order_by('pk').last()
+        VendorProfile.objects.filter(pk=last.pk).update(cuisine="Indian")
+        self.assertNotIn(last.pk, search.ranked_vendor_ids('vendor'))  # ranked past the cap overall
+
+        response = self.client.get('/search/?search=vendor&cuisine=Indian')
+        self.assertEqual(list(response.context['vendor_results']), [last])
+        response = self.client.get('/search/?search=vendor&cuisine=Indian&sort=rating')
+        self.assertEqual(list(response.context['vendor_results']), [last])
+        self.assertEqual(len(self.collect('/search/?search=vendor&page_size=3&sort=price')), 7)
+        facets = self.client.get('/search/?search=vendor').context['facets']
+        self.assertEqual((facets['total'], facets['cuisine']['Indian'], facets['capped']), (7, 1, False))
+        self.assertNotContains(response, 'Only the top')
+
+    @override_settings(SEARCH_MAX_RESULTS=4)
+    def test_capped_fuzzy_query_says_so(self):
+        response = self.client.get('/search/?search=vendr&fuzzy=1&sort=price')
+        self.assertEqual((response.context['facets']['total'], response.context['facets']['capped']), (4, True))
+        self.assertContains(response, 'Only the top 4 matches')
+
+
+class VendorCardQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def add_vendors(self, count):
+        start = VendorProfile.objects.count()
+        for i in range(start, start + count):
+            vendor = VendorProfile.objects.create(
+                user=User.objects.create_user(username=f'card{i}', password='password'),
+                business_name=f"Card Vendor {i}",
+            )
+            FoodItem.objects.create(vendor=vendor, name="Dish", description="Tasty", price=5, image='food_items/dish.jpg')
+            FoodItem.objects.create(vendor=vendor, name="Other", price=7)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_search_page_query_count_is_constant(self):
+        self.add_vendors(2)
+        small = self.count_queries('/search/')
+        self.add_vendors(8)
+        self.assertEqual(self.count_queries('/search/'), small)
+
+    def test_home_page_query_count_is_constant(self):
+        self.add_vendors(1)
+        small = self.count_queries('/')
+        self.add_vendors(4)
+        self.assertEqual(self.count_queries('/'), small)
+
+    def test_cover_item_is_first_food_item(self):
+        self.add_vendors(1)
+        vendor = VendorProfile.objects.with_cover_item().get()
+        self.assertEqual(vendor.cover_item.name, "Dish")
+        self.assertEqual(VendorProfile.objects.get().cover_item.name, "Dish")
+
+
+class SearchCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.thai = VendorProfile.objects.create(
+            user=User.objects.create_user(username='cthai', password='password'),
+            business_name="Thai Cache", cuisine="Thai",
+        )
+        self.japanese = VendorProfile.objects.create(
+            user=User.objects.create_user(username='cjapan', password='password'),
+            business_name="Japan Cache", cuisine="Japanese",
+        )
+        self.reviewer = User.objects.create_user(username='creviewer', password='password')
+
+    def results(self, url):
+        return list(self.client.get(url).context['vendor_results'])
+
+    def test_repeated_search_is_served_from_cache(self):
+        self.assertEqual(self.results('/search/?cuisine=Thai&sort=rating'), [self.thai])
+        with mock.patch('core.search_cache.search_page') as search_page:
+            # Same normalized filters: served from the cache without re-running the search
+            self.assertEqual(self.results('/search/?cuisine=thai&sort=rating'), [self.thai])
+        search_page.assert_not_called()
+
+    def test_review_invalidates_rating_dependent_pages(self):
+        self.assertEqual(self.results('/search/?rating=4'), [])
+        Review.objects.create(user=self.reviewer, vendor=self.thai, rating=5)
+        self.assertEqual(self.results('/search/?rating=4'), [self.thai])
+
+    def test_unrelated_cuisine_change_keeps_entry(self):
+        self.results('/search/?cuisine=Thai&sort=rating')
+        Review.objects.create(user=self.reviewer, vendor=self.japanese, rating=5)
+        with mock.patch('core.search_cache.search_page') as search_page:
+            self.assertEqual(self.results('/search/?cuisine=Thai&sort=rating'), [self.thai])
+        search_page.assert_not_called()
+
+    def test_new_vendor_appears(self):
+        self.results('/search/?cuisine=Thai')
+        newcomer = VendorProfile.objects.create(
+            user=User.objects.create_user(username='cnew', password='password'),
+            business_name="Another Thai", cuisine="Thai",
+        )
+        self.assertEqual(self.results('/search/?cuisine=Thai'), [newcomer, self.thai])
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        autocomplete.index.built_at = None  # force a rebuild from this test's data
+        self.client = Client()
+        self.vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='auto', password='password'),
+            business_name="Ramen House", cuisine="Japanese",
+        )
+        FoodItem.objects.create(vendor=self.vendor, name="Tonkotsu Ramen", price=12)
+
+    def test_suggests_vendors_cuisines_and_dishes(self):
+        data = self.client.get('/search/autocomplete/?q=ram').json()
+        self.assertEqual([v['name'] for v in data['vendors']], ["Ramen House"])
+        self.assertEqual([d['name'] for d in data['dishes']], ["Tonkotsu Ramen"])
+        data = self.client.get('/search/autocomplete/?q=ja').json()
+        self.assertEqual(data['cuisines'], [{'name': 'Japanese'}])
+
+    def test_warm_lookup_does_not_query_database(self):
+        autocomplete.suggest('r')
+        with self.assertNumQueries(0):
+            self.client.get('/search/autocomplete/?q=tonk')
+
+    def test_index_updates_incrementally(self):
+        autocomplete.suggest('r')
+        with self.captureOnCommitCallbacks(execute=True):
+            FoodItem.objects.create(vendor=self.vendor, name="Shoyu Ramen", price=11)
+            self.vendor.business_name = "Noodle House"
+            self.vendor.save()
+        with self.assertNumQueries(0):
+            data = autocomplete.suggest('shoyu')
+            self.assertEqual([d['name'] for d in data[autocomplete.DISH]], ["Shoyu Ramen"])
+            self.assertEqual(autocomplete.suggest('ramen h')[autocomplete.VENDOR], [])
+
+
+class NearbySearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        # Marina Bay as the search origin; roughly 0.5 km, 3 km and 20 km away
+        self.origin = (1.283, 103.860)
+        self.vendors = {}
+        for name, lat, lng in [("Close", 1.2860, 103.8635), ("Mid", 1.3100, 103.8600),
+                               ("Far", 1.3750, 104.0000), ("Nowhere", None, None)]:
+            self.vendors[name] = VendorProfile.objects.create(
+                user=User.objects.create_user(username=name.lower(), password='password'),
+                business_name=name, cuisine="Local", latitude=lat, longitude=lng,
+            )
+
+    def test_geohash_round_trip(self):
+        geohash = geo.encode(1.2860, 103.8635)
+        self.assertEqual(self.vendors["Close"].geohash, geohash)
+        lat, lng = geo.decode(geohash)
+        self.assertAlmostEqual(lat, 1.2860, places=5)
+        self.assertAlmostEqual(lng, 103.8635, places=5)
+        self.assertEqual(self.vendors["Nowhere"].geohash, '')
+
+    def test_radius_and_k_nearest(self):
+        within_5km = geo.nearby_vendors(*self.origin, radius_km=5)
+        self.assertEqual([pk for pk, _ in within_5km], [self.vendors["Close"].pk, self.vendors["Mid"].pk])
+        self.assertLess(within_5km[0][1], 1)
+        nearest = geo.nearby_vendors(*self.origin, k=3)
+        self.assertEqual([pk for pk, _ in nearest], [self.vendors[n].pk for n in ("Close", "Mid", "Far")])
+
+    def test_distance_sort(self):
+        response = self.client.get('/search/?sort=distance&lat=1.283&lng=103.86&radius=30')
+        vendors = list(response.context['vendor_results'])
+        self.assertEqual([v.business_name for v in vendors], ["Close", "Mid", "Far"])
+        self.assertLess(vendors[0].distance_km, vendors[1].distance_km)
+
+    def test_nearby_endpoint(self):
+        data = self.client.get('/vendors/nearby/?lat=1.283&lng=103.86&k=1').json()
+        self.assertEqual([v['name'] for v in data['vendors']], ["Close"])
+        self.assertEqual(self.client.get('/vendors/nearby/?lat=abc').status_code, 400)
+
+
+class MapClusterTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.vendors = [
+            VendorProfile.objects.create(
+                user=User.objects.create_user(username=f'map{i}', password='password'),
+                business_name=f"Map {i}", latitude=lat, longitude=lng,
+            )
+            for i, (lat, lng) in enumerate([(1.2860, 103.8635), (1.2870, 103.8640), (1.3750, 104.0000)])
+        ]
+
+    def clusters(self, zoom, bbox='1.2,103.7,1.45,104.1'):
+        south, west, north, east = bbox.split(',')
+        url = f'/vendors/map/?south={south}&west={west}&north={north}&east={east}&zoom={zoom}'
+        return self.client.get(url).json()
+
+    def assertMatchesRebuild(self):
+        incremental = {c.cell: (c.vendor_count, round(c.latitude_sum, 6)) for c in MapCluster.objects.filter(vendor_count__gt=0)}
+        map_clusters.rebuild()
+        rebuilt = {c.cell: (c.vendor_count, round(c.latitude_sum, 6)) for c in MapCluster.objects.all()}
+        self.assertEqual(incremental, rebuilt)
+
+    def test_clusters_merge_when_zoomed_out(self):
+        self.assertEqual(sorted(c['count'] for c in self.clusters(zoom=11)['clusters']), [1, 2])
+        self.assertEqual([c['count'] for c in self.clusters(zoom=3)['clusters']], [3])
+        pair = max(self.clusters(zoom=11)['clusters'], key=lambda c: c['count'])
+        self.assertAlmostEqual(pair['latitude'], 1.2865)
+
+    def test_viewport_excludes_other_cells_and_zooms_in_to_markers(self):
+        data = self.clusters(zoom=12, bbox='1.28,103.86,1.29,103.87')
+        self.assertEqual(sum(c['count'] for c in data['clusters']), 2)
+        data = self.clusters(zoom=17, bbox='1.28,103.86,1.29,103.87')
+        self.assertEqual(sorted(v['name'] for v in data['vendors']), ["Map 0", "Map 1"])
+        self.assertEqual(self.client.get('/vendors/map/?south=1').status_code, 400)
+
+    def test_moves_and_deletes_update_clusters_incrementally(self):
+        moved = VendorProfile.objects.get(pk=self.vendors[2].pk)
+        moved.latitude, moved.longitude = 1.2865, 103.8638
+        moved.save()
+        self.assertEqual([c['count'] for c in self.clusters(zoom=11)['clusters']], [3])
+        self.vendors[0].delete()
+        VendorProfile.objects.filter(pk=self.vendors[1].pk).first().save(update_fields=['description'])
+        self.assertMatchesRebuild()
+
+
+class SimilarVendorTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.vendors = {}
+        for name, cuisine in [("Thai A", "Thai"), ("Thai B", "Thai"), ("Sushi", "Japanese"), ("Curry", "Indian")]:
+            self.vendors[name] = VendorProfile.objects.create(
+                user=User.objects.create_user(username=name.replace(' ', ''), password='password'),
+                business_name=name, cuisine=cuisine,
+            )
+        # Tourists who booked Thai A also booked Curry
+        for i in range(3):
+            tourist = User.objects.create_user(username=f'fan{i}', password='password')
+            for name in ("Thai A", "Curry"):
+                Booking.objects.create(tourist=tourist, vendor=self.vendors[name], booking_date='2025-05-20',
+                                       booking_time='18:00', number_of_people=2)
+
+    def test_scores_combine_cuisine_and_co_booking(self):
+        recommendations.compute_similar_vendors(k=2)
+        similar = [e.similar.business_name for e in self.vendors["Thai A"].similar_entries.order_by('rank')]
+        self.assertEqual(sorted(similar), ["Curry", "Thai B"])  # not "Sushi": no shared cuisine or tourists
+        similar = [e.similar.business_name for e in self.vendors["Sushi"].similar_entries.order_by('rank')]
+        self.assertEqual(len(similar), 2)
+        self.assertNotIn("Sushi", similar)
+
+    def test_detail_page_reads_precomputed_table(self):
+        url = reverse('vendor-detail', args=[self.vendors["Thai B"].pk])
+        self.assertEqual([v.business_name for v in self.client.get(url).context['similar_vendors']], ["Thai A"])
+        recommendations.compute_similar_vendors()
+        names = [v.business_name for v in self.client.get(url).context['similar_vendors']]
+        self.assertEqual(names[0], "Thai A")
+        self.assertEqual(len(names), 3)
+
+
+class RecommenderTests(TestCase):
+    def setUp(self):
+        self.model_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.model_dir.cleanup)
+        settings_override = override_settings(RECOMMENDER_MODEL_DIR=self.model_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.vendors = [
+            VendorProfile.objects.create(
+                user=User.objects.create_user(username=f'rec{i}', password='password'), business_name=f"Rec {i}",
+            )
+            for i in range(4)
+        ]
+        self.tourist = User.objects.create_user(username='newcomer', password='password')
+        # Fans of vendor 0 also like vendor 1; vendor 2 is popular on its own
+        for i in range(3):
+            fan = User.objects.create_user(username=f'recfan{i}', password='password')
+            for vendor in self.vendors[:2]:
+                Review.objects.create(user=fan, vendor=vendor, rating=5)
+        for i in range(4):
+            Review.objects.create(user=User.objects.create_user(username=f'solo{i}', password='password'),
+                                  vendor=self.vendors[2], rating=4)
+
+    def test_recommends_co_liked_vendors_then_popular(self):
+        self.assertEqual(recommendations.recommended_vendor_ids({self.vendors[0].pk}), [])  # not trained yet
+        recommendations.train_recommender()
+        model = recommendations.load_model()
+        self.assertIsInstance(model.neighbours, np.memmap)
+        ids = recommendations.recommended_vendor_ids({self.vendors[0].pk}, limit=2)
+        self.assertEqual(ids, [self.vendors[1].pk, self.vendors[2].pk])
+        self.assertEqual(recommendations.recommended_vendor_ids(set(), limit=1), [self.vendors[2].pk])
+
+    def test_dashboard_shows_recommendations_and_picks_up_new_model(self):
+        recommendations.train_recommender()
+        Booking.objects.create(tourist=self.tourist, vendor=self.vendors[0], booking_date='2025-05-20',
+                               booking_time='18:00', number_of_people=2)
+        self.client.force_login(self.tourist)
+        response = self.client.get(reverse('tourist-dashboard'))
+        self.assertEqual(response.context['recommended_vendors'][0], self.vendors[1])
+        recommendations.train_recommender()
+        self.assertEqual(len(list(Path(self.model_dir.name).iterdir())), 3)  # 2 versions + CURRENT
+
+
 class BookingTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -48,3 +570,569 @@ class BookingTests(TestCase):
         }, follow=True)
         self.assertEqual(response.status_code, 200)
         self.assertTrue(Booking.objects.exists())
+
+
+class ReservationTests(TestCase):
+    def setUp(self):
+        self.vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='slots', password='password'),
+            business_name="Small Place", seats_per_slot=5,
+        )
+        self.tourist = User.objects.create_user(username='diner', password='password', is_tourist=True)
+        self.client.force_login(self.tourist)
+
+    def book(self, people, booking_time='18:00'):
+        return self.client.post(reverse('vendor-booking', args=[self.vendor.pk]), {
+            'booking_date': '2025-05-20', 'booking_time': booking_time, 'number_of_people': people,
+        })
+
+    def slot(self):
+        return BookingSlot.objects.get(vendor=self.vendor)
+
+    def test_rejects_bookings_beyond_slot_capacity(self):
+        self.assertEqual(self.book(3).status_code, 302)
+        response = self.book(3, booking_time='18:15')  # same 18:00-18:30 slot
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("only 2 seats are left", response.content.decode())
+        self.assertEqual(self.book(2).status_code, 302)
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(self.slot().reserved, 5)
+
+    def test_cancel_and_decline_release_seats_once(self):
+        self.book(5)
+        booking = Booking.objects.get()
+        stale = Booking.objects.get()
+        self.assertTrue(reservations.set_status(booking, 'cancelled'))
+        self.assertFalse(reservations.set_status(stale, 'declined'))  # already cancelled
+        self.assertEqual(self.slot().reserved, 0)
+
+    def test_rebook_moves_seats_between_slots(self):
+        self.book(4)
+        booking = Booking.objects.get()
+        response = self.client.post(reverse('booking-update', args=[booking.pk]), {
+            'booking_date': '2025-05-20', 'booking_time': '19:00', 'number_of_people': 5,
+        })
+        self.assertEqual(response.status_code, 302)
+        taken = dict(BookingSlot.objects.values_list('start_time__hour', 'reserved'))
+        self.assertEqual(taken, {18: 0, 19: 5})
+
+    def test_deleting_bookings_releases_seats(self):
+        self.book(2)
+        self.book(1, booking_time='19:00')
+        self.book(3, booking_time='19:00')
+        reservations.set_status(Booking.objects.get(number_of_people=1), 'cancelled')
+        Booking.objects.get(number_of_people=2).delete()
+        self.tourist.delete()  # cascades to the remaining bookings
+        taken = dict(BookingSlot.objects.values_list('start_time__hour', 'reserved'))
+        self.assertEqual(taken, {18: 0, 19: 0})
+
+    def test_seats_per_slot_must_be_positive(self):
+        self.client.force_login(self.vendor.user)
+        response = self.client.post(reverse('vendor-profile-edit'), {
+            'business_name': 'Small Place', 'cuisine': 'Local', 'latitude': '1.3', 'longitude': '103.8',
+            'seats_per_slot': 0,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('seats_per_slot', response.context['form'].errors)
+        self.vendor.refresh_from_db()
+        self.assertEqual(self.vendor.seats_per_slot, 5)
+
+    def test_bulk_update_changes_pending_bookings_in_one_update(self):
+        for booking_time in ('18:00', '18:10', '19:00'):
+            self.book(1, booking_time=booking_time)
+        first, second, third = Booking.objects.order_by('pk')
+        reservations.set_status(third, 'cancelled')
+        other = VendorProfile.objects.create(user=User.objects.create_user(username='rival', password='password'))
+        foreign = reservations.reserve(Booking(tourist=self.tourist, vendor=other, booking_date=date(2025, 5, 20),
+                                               booking_time=dt_time(18, 0), number_of_people=1))
+
+        self.client.force_login(self.vendor.user)
+        url = reverse('vendor-booking-bulk-update')
+        payload = {'booking_ids': [first.pk, second.pk, third.pk, foreign.pk], 'status': 'declined'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, payload, content_type='application/json')
+        self.assertEqual(response.json()['results'], {
+            str(first.pk): 'declined', str(second.pk): 'declined',
+            str(third.pk): 'unchanged', str(foreign.pk): 'not_found',
+        })
+        updates = [q for q in queries if q['sql'].startswith('UPDATE') and 'core_bookingslot' not in q['sql']
+                   and 'dailystat' not in q['sql']]
+        self.assertEqual(len(updates), 1)
+        taken = dict(BookingSlot.objects.filter(vendor=self.vendor).values_list('start_time__hour', 'reserved'))
+        self.assertEqual(taken, {18: 0, 19: 0})
+        self.assertEqual(Booking.objects.get(pk=foreign.pk).status, 'pending')
+
+        again = self.client.post(url, {'booking_ids': [first.pk], 'status': 'confirmed'})
+        self.assertRedirects(again, reverse('vendor-booking-list'), fetch_redirect_response=False)
+        self.assertEqual(Booking.objects.get(pk=first.pk).status, 'declined')
+        self.assertEqual(self.client.post(url, {'booking_ids': [first.pk], 'status': 'pending'},
+                                          content_type='application/json').status_code, 400)
+
+    @override_settings(DEBUG=True)
+    def test_load_test_endpoint_reports_full_slots(self):
+        url = reverse('test-book-api', args=[self.vendor.pk])
+        payload = {'booking_date': '2025-05-20', 'booking_time': '18:00', 'number_of_people': 2}
+        statuses = [self.client.post(url, payload, content_type='application/json').status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 409])
+
+
+class VendorInboxTests(TestCase):
+    def setUp(self):
+        self.vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='inbox', password='password'), business_name="Busy Inbox",
+        )
+        tourist = User.objects.create_user(username='guest', password='password', is_tourist=True)
+        today = timezone.localdate()
+        self.bookings = {}
+        for name, days, status in [('soon', 1, 'pending'), ('later', 3, 'pending'), ('latest', 5, 'pending'),
+                                   ('confirmed', 2, 'confirmed'), ('declined', 4, 'declined'),
+                                   ('old', -2, 'confirmed')]:
+            self.bookings[name] = Booking.objects.create(
+                tourist=tourist, vendor=self.vendor, booking_date=today + timedelta(days=days),
+                booking_time=dt_time(18, 0), number_of_people=2, status=status,
+            )
+        self.client.force_login(self.vendor.user)
+
+    def tab(self, **params):
+        response = self.client.get(reverse('vendor-booking-list'), params)
+        names = {booking.pk: name for name, booking in self.bookings.items()}
+        return [names[b.pk] for b in response.context['bookings']], response.context['next_page_url']
+
+    @override_settings(VENDOR_INBOX_PAGE_SIZE=2)
+    def test_tabs_are_keyset_paginated(self):
+        first, next_url = self.tab()
+        self.assertEqual(first, ['soon', 'later'])
+        second = self.client.get(next_url).context
+        self.assertEqual([b.pk for b in second['bookings']], [self.bookings['latest'].pk])
+        self.assertIsNone(second['next_page_url'])
+        self.assertEqual(self.tab(tab='confirmed'), (['confirmed'], None))
+        self.assertEqual(self.tab(tab='past'), (['declined', 'old'], None))
+
+    @skipIf(connection.vendor != 'sqlite', "EXPLAIN QUERY PLAN output is SQLite's")
+    def test_past_tab_reads_in_index_order(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.tab(tab='past')
+        sql = next(q['sql'] for q in queries if 'FROM "core_booking"' in q['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('core_booking_vendor_date_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class TouristBookingListTests(TestCase):
+    def setUp(self):
+        self.tourist = User.objects.create_user(username='traveller', password='password', is_tourist=True)
+        today = timezone.localdate()
+        for i, days in enumerate([3, 1, -1, -2, -3, -4]):
+            vendor = VendorProfile.objects.create(
+                user=User.objects.create_user(username=f'stall{i}', password='password'), business_name=f"Stall {i}",
+            )
+            Booking.objects.create(tourist=self.tourist, vendor=vendor, booking_date=today + timedelta(days=days),
+                                   booking_time=dt_time(12, 0), number_of_people=2)
+        self.client.force_login(self.tourist)
+
+    @override_settings(TOURIST_BOOKINGS_PAGE_SIZE=2)
+    def test_upcoming_first_then_paginated_past(self):
+        url = reverse('my-bookings')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len([q for q in queries if 'core_booking' in q['sql']]), 2)  # upcoming + one past page
+        self.assertEqual([b.vendor.business_name for b in response.context['upcoming_bookings']], ["Stall 1", "Stall 0"])
+        self.assertEqual([b.vendor.business_name for b in response.context['past_bookings']], ["Stall 2", "Stall 3"])
+        self.assertContains(response, "Stall 1")
+
+        older = self.client.get(response.context['next_page_url'])
+        self.assertEqual(older.context['upcoming_bookings'], [])
+        self.assertEqual([b.vendor.business_name for b in older.context['past_bookings']], ["Stall 4", "Stall 5"])
+        self.assertIsNone(older.context['next_page_url'])
+        self.assertNotContains(older, "No upcoming bookings")
+
+    @override_settings(TOURIST_BOOKINGS_PAGE_SIZE=2)
+    def test_soonest_upcoming_bookings_are_on_the_first_page(self):
+        vendor = VendorProfile.objects.get(business_name="Stall 0")
+        for days in (2, 5, 0):
+            Booking.objects.create(tourist=self.tourist, vendor=vendor, booking_date=timezone.localdate() + timedelta(days=days),
+                                   booking_time=dt_time(12, 0), number_of_people=2)
+        response = self.client.get(reverse('my-bookings'))
+        offsets = [(b.booking_date - timezone.localdate()).days for b in response.context['upcoming_bookings']]
+        self.assertEqual(offsets, [0, 1, 2, 3, 5])
+
+
+class AdminDashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        tourist = User.objects.create_user(username='fan', password='password', is_tourist=True)
+        vendor = User.objects.create_user(username='chef', password='password', is_vendor=True).vendor_profile
+        Review.objects.create(user=tourist, vendor=vendor, rating=5, comment="Great")
+        Review.objects.create(user=tourist, vendor=vendor, rating=3, comment="")
+        for status in ('pending', 'pending', 'confirmed', 'declined'):
+            Booking.objects.create(tourist=tourist, vendor=vendor, booking_date=date(2025, 5, 20),
+                                   booking_time=dt_time(18, 0), number_of_people=2, status=status)
+
+    def test_one_query_per_table_then_cached(self):
+        url = reverse('admin-dashboard')
+        # totals and signups chart, both from the DailyStat rollups -- new panels belong in those two
+        with self.assertNumQueries(2):
+            context = self.client.get(url).context
+        self.assertEqual(
+            [context[k] for k in ('total_users', 'total_tourists', 'total_vendors', 'total_reviews',
+                                  'reviews_with_comment', 'reviews_without_comment', 'total_bookings',
+                                  'pending_bookings', 'confirmed_bookings')],
+            [2, 1, 1, 2, 1, 1, 4, 2, 1],
+        )
+        self.assertEqual(sum(context['signup_tourists']) + sum(context['signup_vendors']), 2)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_stale_figures_are_served_while_refreshing(self):
+        dashboard.refresh()
+        entry = cache.get(dashboard.CACHE_KEY)
+        entry['computed_at'] -= 3600
+        cache.set(dashboard.CACHE_KEY, entry)
+        with mock.patch.object(dashboard, '_refresh_in_background') as refresh, self.assertNumQueries(0):
+            self.assertEqual(dashboard.dashboard_stats()['total_bookings'], 4)
+            dashboard.dashboard_stats()
+        refresh.assert_called_once_with()
+
+
+class DailyStatTests(TestCase):
+    def stats(self, model=DailyStat):
+        return dict(((day, metric), count) for day, metric, count in
+                    model.objects.exclude(count=0).values_list('day', 'metric', 'count'))
+
+    def test_incremental_counts_match_a_rebuild(self):
+        tourist = User.objects.create_user(username='roamer', password='password', is_tourist=True)
+        switcher = User.objects.create_user(username='switcher', password='password', is_tourist=True)
+        switcher.is_tourist, switcher.is_vendor = False, True
+        switcher.save()
+        vendor = VendorProfile.objects.create(user=switcher, business_name="Switcher's")
+        review = Review.objects.create(user=tourist, vendor=vendor, rating=4, comment="")
+        review.comment = "Lovely"
+        review.save()
+        bookings = [reservations.reserve(Booking(tourist=tourist, vendor=vendor, booking_date=date(2025, 5, 20),
+                                                 booking_time=dt_time(18, 0), number_of_people=1)) for _ in range(4)]
+        reservations.set_status(bookings[0], 'cancelled')
+        reservations.bulk_set_status(vendor, [bookings[1].pk, bookings[2].pk], 'confirmed')
+        bookings[3].delete()
+        BookingRequest.objects.create(tourist=tourist, vendor=vendor, booking_date=date(2025, 5, 21),
+                                      booking_time=dt_time(19, 0), number_of_people=2)
+        booking_queue.process_batch()
+        User.objects.create_user(username='leaver', password='password').delete()
+
+        today = timezone.localdate()
+        incremental = self.stats()
+        self.assertEqual(incremental, {
+            (today, 'signups:tourist'): 1, (today, 'signups:vendor'): 1, (today, 'reviews:comment'): 1,
+            (today, 'bookings:cancelled'): 1, (today, 'bookings:confirmed'): 2, (today, 'bookings:pending'): 1,
+        })
+        self.assertEqual(dashboard.compute_stats()['total_bookings'], 4)
+        visit, queued = date(2025, 5, 20), date(2025, 5, 21)
+        by_vendor = self.stats(VendorDailyStat)
+        self.assertEqual(by_vendor, {
+            (visit, 'bookings:cancelled'): 1, (visit, 'bookings:confirmed'): 2, (visit, 'party:1'): 3,
+            (visit, 'hour:18'): 3, (queued, 'bookings:pending'): 1, (queued, 'party:2'): 1, (queued, 'hour:19'): 1,
+            (today, 'rating:4'): 1,
+        })
+        call_command('rebuild_daily_stats', stdout=StringIO())
+        self.assertEqual(self.stats(), incremental)
+        self.assertEqual(self.stats(VendorDailyStat), by_vendor)
+        DailyStat.objects.all().delete()
+        call_command('rebuild_daily_stats', days=1, stdout=StringIO())
+        self.assertEqual(self.stats(), incremental)
+
+    def test_bulk_created_reviews_are_counted_and_removed(self):
+        vendor = VendorProfile.objects.create(user=User.objects.create_user(username='bulk', password='password'),
+                                              business_name="Bulk Bites")
+        Review.objects.create(user=User.objects.create_user(username='first', password='password'), vendor=vendor, rating=5)
+        Review.objects.bulk_create([
+            Review(user=User.objects.create_user(username=f'bulk{i}', password='password'), vendor=vendor,
+                   rating=rating, comment=comment)
+            for i, (rating, comment) in enumerate([(3, ""), (4, "Good")])
+        ])
+        self.assertEqual(dashboard.compute_stats()['total_reviews'], 3)
+        today = timezone.localdate()
+        self.assertEqual(self.stats(VendorDailyStat), {(today, 'rating:5'): 1, (today, 'rating:3'): 1, (today, 'rating:4'): 1})
+
+        Review.objects.all().delete()
+        self.assertEqual(dashboard.compute_stats()['total_reviews'], 0)
+        for model in (DailyStat, VendorDailyStat):
+            self.assertFalse(model.objects.filter(metric__regex=r'^(reviews|rating):').exclude(count=0).exists())
+
+
+class VendorAnalyticsTests(TestCase):
+    def test_charts_come_from_rollups(self):
+        vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='numbers', password='password'), business_name="Numbers",
+        )
+        tourist = User.objects.create_user(username='regular', password='password', is_tourist=True)
+        today = timezone.localdate()
+        for days_ago, at, people, status in [(1, 12, 2, 'confirmed'), (1, 19, 4, 'confirmed'), (2, 19, 2, 'declined'),
+                                             (2, 19, 2, 'confirmed'), (400, 19, 9, 'confirmed')]:
+            Booking.objects.create(tourist=tourist, vendor=vendor, booking_date=today - timedelta(days=days_ago),
+                                   booking_time=dt_time(at, 0), number_of_people=people, status=status)
+        Review.objects.create(user=tourist, vendor=vendor, rating=4)
+        Review.objects.create(user=tourist, vendor=vendor, rating=5)
+
+        self.client.force_login(vendor.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('vendor-analytics'))
+        data = response.context['analytics']
+        self.assertContains(response, '<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>', html=True)
+        self.assertFalse([q for q in queries if 'core_booking' in q['sql'] or 'core_review' in q['sql']])
+        self.assertEqual(data['total_bookings'], 4)  # the 400-day-old booking is outside the window
+        self.assertEqual(data['bookings_per_day'][-3:], [2, 2, 0])
+        self.assertEqual(data['confirmation_rate'], 0.75)
+        self.assertEqual((data['party_sizes'], data['party_counts']), ([2, 4], [3, 1]))
+        self.assertEqual((data['party_median'], data['party_p90']), (2, 4))
+        self.assertEqual(data['peak_hours'], [19, 12])
+        self.assertEqual(data['monthly_rating'][-1], 4.5)
+
+    def test_deleting_a_vendor_with_bookings_and_reviews(self):
+        owner = User.objects.create_user(username='closing', password='password')
+        vendor = VendorProfile.objects.create(user=owner, business_name="Closing Down")
+        tourist = User.objects.create_user(username='loyal', password='password', is_tourist=True)
+        Booking.objects.create(tourist=tourist, vendor=vendor, booking_date=timezone.localdate(),
+                               booking_time=dt_time(12, 0), number_of_people=2)
+        Review.objects.create(user=tourist, vendor=vendor, rating=5)
+        owner.delete()  # cascades to the profile, its VendorDailyStat rows, bookings and reviews
+        self.assertFalse(VendorDailyStat.objects.exists())
+        self.assertFalse(DailyStat.objects.filter(count__lt=0).exists())
+        self.assertEqual(dashboard.compute_stats()['total_reviews'], 0)
+
+
+class AdminExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='ops', password='password', email='ops@example.com')
+        for i in range(4):
+            User.objects.create_user(username=f'user{i}', password='password', email=f'u{i}@example.com',
+                                     is_tourist=i % 2 == 0)
+        self.client.force_login(self.admin)
+
+    def test_exports_stream_in_keyset_chunks(self):
+        fields = ('id', 'username')
+        with CaptureQueriesContext(connection) as queries:
+            records = list(exports.rows(User.objects.all(), fields, chunk_size=2))
+        self.assertEqual([r[1] for r in records], ['ops', 'user0', 'user1', 'user2', 'user3'])
+        self.assertEqual(len(queries), 3)
+
+        response = self.client.get(reverse('admin-export', args=['users']), {'role': 'tourist'})
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment; filename="users-', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:2], ['id', 'username'])
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['user0', 'user2'])
+
+        response = self.client.get(reverse('admin-export', args=['users']), {'format': 'ndjson'})
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(records[0]['username'], 'ops')
+        self.assertEqual(self.client.get(reverse('admin-export', args=['payments'])).status_code, 404)
+
+    def test_csv_cells_cannot_start_formulas(self):
+        vendor = VendorProfile.objects.create(user=User.objects.get(username='user1'), business_name="@Home Kitchen")
+        Review.objects.create(user=User.objects.get(username='user0'), vendor=vendor, rating=1,
+                              comment='=HYPERLINK("http://example.com")')
+        response = self.client.get(reverse('admin-export', args=['reviews']))
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn("'@Home Kitchen", content)
+        self.assertIn('"\'=HYPERLINK(""http://example.com"")"', content)
+
+        response = self.client.get(reverse('admin-export', args=['reviews']), {'format': 'ndjson'})
+        record = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(record['comment'], '=HYPERLINK("http://example.com")')
+
+    def test_exports_are_for_superusers_only(self):
+        self.client.force_login(User.objects.get(username='user0'))
+        self.assertEqual(self.client.get(reverse('admin-export', args=['bookings'])).status_code, 302)
+
+    @override_settings(ADMIN_USERS_PAGE_SIZE=3)
+    def test_user_list_is_paginated(self):
+        response = self.client.get(reverse('admin-user-list'))
+        self.assertEqual([u.username for u in response.context['users']], ['user3', 'user2', 'user1'])
+        older = self.client.get(response.context['next_page_url'])
+        self.assertEqual([u.username for u in older.context['users']], ['user0', 'ops'])
+        self.assertIsNone(older.context['next_page_url'])
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        VendorProfile.objects.create(user=User.objects.create_user(username='metrics', password='password'),
+                                     business_name="Metrics Vendor")
+
+    def test_server_timing_reports_query_count_and_phases(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('search-results'))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        for phase in ('view;dur=', 'tpl;dur=', 'total;dur='):
+            self.assertIn(phase, timing)
+
+    def test_logs_request_and_flags_query_heavy_ones(self):
+        with self.assertLogs('core.instrumentation', 'INFO') as logs:
+            self.client.get(reverse('search-results'))
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(logs.records[0].request_metrics['view'], 'search-results')
+        with override_settings(REQUEST_METRICS_MAX_QUERIES=0), self.assertLogs('core.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('search-results'))
+        self.assertTrue(logs.records[0].request_metrics['slow'])
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        self.vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='calendar', password='password'),
+            business_name="Calendar Cafe", seats_per_slot=4,
+        )
+        self.tourist = User.objects.create_user(username='planner', password='password', is_tourist=True)
+
+    def book(self, day, at, people):
+        return reservations.reserve(Booking(tourist=self.tourist, vendor=self.vendor, booking_date=day,
+                                            booking_time=at, number_of_people=people))
+
+    def slots(self, day):
+        url = reverse('vendor-availability', args=[self.vendor.pk])
+        data = self.client.get(url, {'start': day.isoformat(), 'end': day.isoformat()}).json()
+        return {s['time']: s['remaining'] for s in data['days'][0]['slots']}
+
+    @override_settings(BOOKING_OPENING_HOURS=('18:00', '20:00'))
+    def test_reports_remaining_seats_per_slot_and_follows_changes(self):
+        day = date(2025, 5, 20)
+        booking = self.book(day, dt_time(18, 10), 3)
+        self.book(day, dt_time(18, 45), 4)
+        self.assertEqual(self.slots(day), {'18:00': 1, '18:30': 0, '19:00': 4, '19:30': 4})
+        reservations.set_status(booking, 'declined')
+        self.assertEqual(self.slots(day)['18:00'], 4)
+
+    def test_reads_the_rollup_not_bookings(self):
+        url = reverse('vendor-availability', args=[self.vendor.pk])
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(url, {'start': '2025-05-20', 'end': '2025-05-26'}).json()
+        self.assertEqual(len(data['days']), 7)
+        self.assertFalse([q for q in queries if 'core_booking"' in q['sql'] or 'core_booking`' in q['sql']])
+        self.assertEqual(self.client.get(url, {'start': '2025-05-20', 'end': '2025-01-01'}).status_code, 400)
+
+
+class IdempotentBookingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='idem', password='password'), business_name="Once Only",
+        )
+        self.tourist = User.objects.create_user(username='clicker', password='password', is_tourist=True)
+        self.client.force_login(self.tourist)
+        self.form = {'booking_date': '2025-05-20', 'booking_time': '18:00', 'number_of_people': 2}
+
+    def test_double_submitted_form_creates_one_booking(self):
+        url = reverse('vendor-booking', args=[self.vendor.pk])
+        key = self.client.get(url).context['idempotency_key']
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(url, {**self.form, 'idempotency_key': key})
+            self.assertRedirects(response, reverse('my-bookings'), fetch_redirect_response=False)
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(BookingSlot.objects.get().reserved, 2)
+        self.client.post(url, {**self.form, 'idempotency_key': 'another-key'})
+        self.assertEqual(Booking.objects.count(), 2)
+
+    def test_replay_after_cache_expiry_hits_unique_constraint(self):
+        fields = {'booking_date': date(2025, 5, 20), 'booking_time': dt_time(18, 0), 'number_of_people': 2}
+        first = reservations.reserve(Booking(tourist=self.tourist, vendor=self.vendor, idempotency_key='k1', **fields))
+        cache.clear()
+        again = reservations.reserve(Booking(tourist=self.tourist, vendor=self.vendor, idempotency_key='k1', **fields))
+        self.assertEqual(again.pk, first.pk)
+        self.assertEqual(BookingSlot.objects.get().reserved, 2)
+
+    @override_settings(DEBUG=True)
+    def test_api_replay_does_not_touch_booking_table(self):
+        url = reverse('test-book-api', args=[self.vendor.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.client.post(url, self.form, content_type='application/json', HTTP_IDEMPOTENCY_KEY='retry-1').json()
+        with CaptureQueriesContext(connection) as queries:
+            replay = self.client.post(url, self.form, content_type='application/json', HTTP_IDEMPOTENCY_KEY='retry-1').json()
+        self.assertEqual(replay, {**first, 'replayed': True})
+        self.assertFalse([q for q in queries if 'core_booking' in q['sql']])
+
+
+@override_settings(BOOKING_ASYNC_INTAKE=True)
+class BookingQueueTests(TestCase):
+    def setUp(self):
+        self.vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='queued', password='password'),
+            business_name="Queue Corner", seats_per_slot=5,
+        )
+        self.tourist = User.objects.create_user(username='waiter', password='password', is_tourist=True)
+        self.client.force_login(self.tourist)
+
+    def submit(self, people, key):
+        return self.client.post(reverse('vendor-booking', args=[self.vendor.pk]), {
+            'booking_date': '2025-05-20', 'booking_time': '18:00', 'number_of_people': people,
+            'idempotency_key': key,
+        })
+
+    def status(self, token):
+        return self.client.get(reverse('booking-request-status', args=[token])).json()
+
+    def test_worker_accepts_in_order_until_slot_is_full(self):
+        responses = [self.submit(people, f'k{i}') for i, people in enumerate([2, 2, 2, 1])]
+        self.assertEqual({r.status_code for r in responses}, {202})
+        self.assertEqual(Booking.objects.count(), 0)
+        tokens = [r.context['intake'].token for r in responses]
+        self.assertEqual(self.status(tokens[0])['status'], 'queued')
+
+        self.assertEqual(booking_queue.process_batch(), 4)
+        self.assertEqual([self.status(t)['status'] for t in tokens], ['accepted', 'accepted', 'rejected', 'accepted'])
+        self.assertIn("only 1 seats", self.status(tokens[2])['error'])
+        self.assertEqual(Booking.objects.count(), 3)
+        self.assertEqual(BookingSlot.objects.get().reserved, 5)
+        self.assertEqual(self.status(tokens[0])['booking_id'], Booking.objects.get(idempotency_key='k0').pk)
+        self.assertEqual(booking_queue.process_batch(), 0)
+
+    def test_resubmission_and_retried_batch_book_once(self):
+        first, again = self.submit(2, 'same'), self.submit(2, 'same')
+        self.assertEqual(first.context['intake'].pk, again.context['intake'].pk)
+        requests = booking_queue.claim(10)
+        booking_queue._process(requests)
+        booking_queue._process(requests)  # a worker that died after committing, re-run
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(BookingSlot.objects.get().reserved, 2)
+        self.assertEqual(BookingRequest.objects.get().status, 'accepted')
+
+    @override_settings(DEBUG=True)
+    def test_load_test_endpoint_returns_status_url(self):
+        url = reverse('test-book-api', args=[self.vendor.pk])
+        payload = {'booking_date': '2025-05-20', 'booking_time': '18:00', 'number_of_people': 2}
+        response = self.client.post(url, payload, content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        call_command('process_booking_queue', once=True)
+        self.assertEqual(self.client.get(response.json()['status_url']).json()['status'], 'accepted')
+
+
+@skipIf(connection.vendor == 'sqlite', "SQLite serializes all writers; run against MySQL")
+class ConcurrentReservationTests(TransactionTestCase):
+    def test_concurrent_bookings_never_overbook(self):
+        vendor = VendorProfile.objects.create(
+            user=User.objects.create_user(username='busy', password='password'),
+            business_name="Busy Place", seats_per_slot=10,
+        )
+        tourist = User.objects.create_user(username='crowd', password='password', is_tourist=True)
+        results = []
+
+        def attempt():
+            try:
+                reservations.reserve(Booking(tourist=tourist, vendor=vendor, booking_date=date(2025, 5, 20),
+                                             booking_time=dt_time(18, 0), number_of_people=1))
+                results.append(True)
+            except reservations.SlotFull:
+                results.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt) for _ in range(30)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 10)
+        self.assertEqual(Booking.objects.count(), 10)
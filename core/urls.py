@@ -9,11 +9,16 @@ from .views import (
     VendorDetailView,
     VendorProfileCreateView,
     BookingCreateView,
+    VendorAvailabilityView,
+    BookingRequestStatusView,
     TouristBookingListView,
     RegisterView,
     CustomLoginView,
     ThankYouView,
     SearchResultsView,
+    AutocompleteView,
+    NearbyVendorsView,
+    MapClustersView,
     BookingCancelView,
     EditProfileView,
     TouristProfileUpdateView,
@@ -24,9 +29,12 @@ from .views import (
     edit_tourist_profile,
     VendorBookingListView,
     VendorBookingUpdateView,
+    VendorBookingBulkUpdateView,
     VendorProfileUpdateView,
     VendorDashboardView,
+    VendorAnalyticsView,
     AdminDashboardView,
+    AdminExportView,
     AdminUserListView,
     TestBookingAPI,  # Added missing import
 )
@@ -39,6 +47,7 @@ urlpatterns = [
     # Admin page
     path('site-admin/dashboard/', AdminDashboardView.as_view(), name='admin-dashboard'),
     path('site-admin/users/', AdminUserListView.as_view(), name='admin-user-list'),
+    path('site-admin/export/<slug:dataset>/', AdminExportView.as_view(), name='admin-export'),
     # Authentication
     path('login/', CustomLoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
@@ -58,6 +67,8 @@ urlpatterns = [
     path('vendors/<int:pk>/', VendorDetailView.as_view(), name='vendor-detail'),
     path('vendor/setup/', VendorProfileCreateView.as_view(), name='vendor-setup'),
     path('vendors/<int:pk>/book/', BookingCreateView.as_view(), name='vendor-booking'),
+    path('vendors/<int:pk>/availability/', VendorAvailabilityView.as_view(), name='vendor-availability'),
+    path('bookings/requests/<uuid:token>/', BookingRequestStatusView.as_view(), name='booking-request-status'),
     # Tourist Booking Management
     path('my-bookings/', TouristBookingListView.as_view(), name='my-bookings'),
     path('booking/<int:pk>/cancel/', BookingCancelView.as_view(), name='booking-cancel'),
@@ -66,12 +77,17 @@ urlpatterns = [
     path('profile/edit/', TouristProfileUpdateView.as_view(), name='edit-profile'),
     # Search functionalit
     path('search/', SearchResultsView.as_view(), name='search-results'),
+    path('search/autocomplete/', AutocompleteView.as_view(), name='search-autocomplete'),
+    path('vendors/nearby/', NearbyVendorsView.as_view(), name='vendors-nearby'),
+    path('vendors/map/', MapClustersView.as_view(), name='vendors-map'),
     # Vendor Review
     path('vendors/<int:vendor_id>/review/', ReviewCreateView.as_view(), name='submit-review'),
     # Vendor Profile
     path('vendor/bookings/', VendorBookingListView.as_view(), name='vendor-booking-list'),
     path('vendor/bookings/<int:pk>/update/', VendorBookingUpdateView.as_view(), name='vendor-booking-update'),
+    path('vendor/bookings/bulk-update/', VendorBookingBulkUpdateView.as_view(), name='vendor-booking-bulk-update'),
     path('vendor/dashboard/', VendorDashboardView.as_view(), name='vendor-dashboard'),
+    path('vendor/analytics/', VendorAnalyticsView.as_view(), name='vendor-analytics'),
     path('vendor/profile/edit/', VendorProfileUpdateView.as_view(), name='vendor-profile-edit'),
     #static pages
     path('about/', TemplateView.as_view(template_name='static/about.html'), name='about'),
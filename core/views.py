@@ -1,7 +1,9 @@
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView, TemplateView
 from django.urls import reverse, reverse_lazy
-from .models import FoodItem, VendorProfile, Booking, Cuisine, Review, TouristProfile
-from .forms import VendorProfileForm, UserRegisterForm, EditProfileForm, ReviewForm, TouristAccountForm, TouristProfileForm, UserUpdateForm
+from .models import FoodItem, VendorProfile, Booking, BookingRequest, Cuisine, Review, TouristProfile
+from .pagination import KeysetPaginator
+from . import analytics, autocomplete, booking_queue, dashboard, exports, geo, map_clusters, recommendations, reservations, search, search_cache
+from .forms import BookingForm, VendorProfileForm, UserRegisterForm, EditProfileForm, ReviewForm, TouristAccountForm, TouristProfileForm, UserUpdateForm
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import User
 from django.contrib.auth import login, logout
@@ -11,15 +13,17 @@ from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import redirect, get_object_or_404, render
 from django.views.decorators.csrf import csrf_exempt
-from django.http import JsonResponse
+from django.http import Http404, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
+from django.conf import settings
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.views import LoginView, PasswordChangeView
 from django.contrib.auth import get_user_model
 import json
-from django.db.models import Q, Avg, Min, Count
-from django.db.models.functions import TruncMonth
+import math
+import uuid
+from django.db.models import Q
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
 from django.views import View
 from decimal import Decimal
 
@@ -31,62 +35,21 @@ class AdminDashboardView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-
-        total_users = User.objects.count()
-        total_tourists = User.objects.filter(is_tourist=True).count()
-        total_vendors = User.objects.filter(is_vendor=True).count()
-        total_reviews = Review.objects.count()
-        reviews_with_comment = Review.objects.exclude(comment__isnull=True).exclude(comment__exact="").count()
-        reviews_without_comment = total_reviews - reviews_with_comment
-
-        total_bookings = Booking.objects.count()
-        pending_bookings = Booking.objects.filter(status='pending').count()
-        confirmed_bookings = Booking.objects.filter(status='confirmed').count()
-
-        # 📊 Signups Over Last 6 Months
-        six_months_ago = timezone.now() - timedelta(days=180)
-        signup_data = (
-            User.objects.filter(date_joined__gte=six_months_ago)
-            .annotate(month=TruncMonth('date_joined'))
-            .values('month', 'is_tourist', 'is_vendor')
-            .annotate(count=Count('id'))
-            .order_by('month')
-        )
-
-        monthly_data = {}
-        for entry in signup_data:
-            month_str = entry['month'].strftime('%b %Y')
-            if month_str not in monthly_data:
-                monthly_data[month_str] = {'tourists': 0, 'vendors': 0}
-            if entry['is_tourist']:
-                monthly_data[month_str]['tourists'] += entry['count']
-            elif entry['is_vendor']:
-                monthly_data[month_str]['vendors'] += entry['count']
-
-        signup_months = list(monthly_data.keys())
-        signup_tourists = [monthly_data[m]['tourists'] for m in signup_months]
-        signup_vendors = [monthly_data[m]['vendors'] for m in signup_months]
-
-        context.update({
-            'total_users': total_users,
-            'total_tourists': total_tourists,
-            'total_vendors': total_vendors,
-            'total_reviews': total_reviews,
-            'reviews_with_comment': reviews_with_comment,
-            'reviews_without_comment': reviews_without_comment,
-            'total_bookings': total_bookings,
-            'pending_bookings': pending_bookings,
-            'confirmed_bookings': confirmed_bookings,
-            'signup_months': signup_months,
-            'signup_tourists': signup_tourists,
-            'signup_vendors': signup_vendors,
-        })
-
+        # One aggregate query per table, cached and refreshed in the background (core/dashboard.py)
+        context.update(dashboard.dashboard_stats())
         return context
 
-# Admin user list view
+def _users_with_role(users, role):
+    if role == 'tourist':
+        return users.filter(is_tourist=True)
+    if role == 'vendor':
+        return users.filter(is_vendor=True)
+    return users
+
+# Admin user list view: keyset pages, newest first
 class AdminUserListView(LoginRequiredMixin, TemplateView):
     template_name = 'admin/admin_user_list.html'
+    ORDERING = [('date_joined', True, False), ('pk', True, False)]
 
     @method_decorator(user_passes_test(lambda u: u.is_superuser))
     def dispatch(self, *args, **kwargs):
@@ -96,15 +59,41 @@ class AdminUserListView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         role = self.request.GET.get('role')
 
-        users = User.objects.all().order_by('-date_joined')
-        if role == 'tourist':
-            users = users.filter(is_tourist=True)
-        elif role == 'vendor':
-            users = users.filter(is_vendor=True)
-
-        context['users'] = users
+        users = _users_with_role(
+            User.objects.only('username', 'email', 'is_tourist', 'is_vendor', 'is_active', 'date_joined'), role
+        )
+        cursor = self.request.GET.get('cursor')
+        page_size = getattr(settings, 'ADMIN_USERS_PAGE_SIZE', 50)
+        context['users'], next_cursor = KeysetPaginator(self.ORDERING, page_size).page(users, cursor)
+
+        next_page_url = None
+        if next_cursor:
+            params = self.request.GET.copy()
+            params['cursor'] = next_cursor
+            next_page_url = f"{self.request.path}?{params.urlencode()}"
+        context['next_page_url'] = next_page_url
         context['selected_role'] = role
         return context
+
+# Streaming exports for reporting: /site-admin/export/<users|bookings|reviews>/?format=csv|ndjson
+# (users also take ?role=), read in keyset chunks so memory use does not grow with the row count
+class AdminExportView(LoginRequiredMixin, View):
+    @method_decorator(user_passes_test(lambda u: u.is_superuser))
+    def dispatch(self, *args, **kwargs):
+        return super().dispatch(*args, **kwargs)
+
+    def get(self, request, dataset):
+        fmt = request.GET.get('format', 'csv')
+        if dataset not in exports.DATASETS or fmt not in exports.FORMATS:
+            raise Http404
+        model, fields = exports.DATASETS[dataset]
+        queryset = model.objects.all()
+        if dataset == 'users':
+            queryset = _users_with_role(queryset, request.GET.get('role'))
+        content_type, encode = exports.FORMATS[fmt]
+        response = StreamingHttpResponse(encode(fields, exports.rows(queryset, fields)), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{dataset}-{timezone.localdate():%Y%m%d}.{fmt}"'
+        return response
     
 # User form for admin editing
 class AdminUserEditForm(forms.ModelForm):
@@ -138,7 +127,7 @@ class HomeView(TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['featured_vendors'] = VendorProfile.objects.prefetch_related('food_items').order_by('-created_at')[:3]
+        context['featured_vendors'] = VendorProfile.objects.with_cover_item().order_by('-created_at')[:3]
         return context
 
 
@@ -159,46 +148,119 @@ class SearchResultsView(TemplateView):
         if sort == 'top' and not selected_rating:
             selected_rating = '4'
 
-        # Annotate vendors with average rating and minimum price
-        vendors = VendorProfile.objects.annotate(
-            avg_rating=Avg('reviews__rating'),
-            min_price=Min('food_items__price')
-        )
-
-        # Text search
-        if query:
-            vendors = vendors.filter(
-                Q(business_name__icontains=query) |
-                Q(description__icontains=query)
+        # One bounded page per request: keyset cursor instead of OFFSET, served from the result cache
+        filters = search.SearchFilters.from_params(request.GET)
+        cursor = request.GET.get('cursor')
+        page_size = search.page_size_from(request.GET.get('page_size'))
+        vendor_results, next_cursor = search_cache.cached_search_page(filters, cursor, page_size)
+
+        # Distance from the searcher's location, when given, for vendors that have one
+        located = [v for v in vendor_results if v.geohash] if filters.lat is not None else []
+        for vendor in vendor_results:
+            vendor.distance_km = None
+        if located:
+            distances = geo.haversine_km(
+                filters.lat, filters.lng,
+                [float(v.latitude) for v in located], [float(v.longitude) for v in located],
             )
+            for vendor, distance in zip(located, distances):
+                vendor.distance_km = float(distance)
 
-        if selected_cuisine:
-            vendors = vendors.filter(cuisine__iexact=selected_cuisine)
-
-        if selected_price:
-            try:
-                vendors = vendors.filter(min_price__lte=int(selected_price))
-            except ValueError:
-                pass  # Fail silently if price input is not numeric
-
-        if selected_rating:
-            try:
-                vendors = vendors.filter(avg_rating__gte=int(selected_rating))
-            except ValueError:
-                pass  # Same for rating
+        next_page_url = None
+        if next_cursor:
+            params = request.GET.copy()
+            params['cursor'] = next_cursor
+            next_page_url = f"{request.path}?{params.urlencode()}"
 
         context.update({
             'query': query,
-            'vendor_results': vendors.order_by('business_name').distinct(),
+            'vendor_results': vendor_results,
+            'next_page_url': next_page_url,
+            'is_first_page': not cursor,
+            'fuzzy': filters.fuzzy,
+            'facets': search_cache.cached_facet_counts(filters),
             'selected_cuisine': selected_cuisine,
             'selected_price': selected_price,
             'selected_rating': selected_rating,
             'sort': sort,
+            'lat': filters.lat,
+            'lng': filters.lng,
             'today': timezone.now() - timedelta(days=7),
         })
 
         return context
 
+# Type-ahead suggestions for the search box, served from the in-process prefix index
+class AutocompleteView(View):
+    def get(self, request):
+        query = request.GET.get('q', '')
+        try:
+            limit = max(1, min(int(request.GET.get('limit', 5)), 10))
+        except ValueError:
+            limit = 5
+        suggestions = autocomplete.suggest(query, limit)
+        return JsonResponse({
+            'query': query,
+            'vendors': suggestions[autocomplete.VENDOR],
+            'cuisines': suggestions[autocomplete.CUISINE],
+            'dishes': suggestions[autocomplete.DISH],
+        })
+
+# Nearest vendors to a point as JSON: ?lat=&lng=&radius= (km) and/or &k= (count)
+class NearbyVendorsView(View):
+    def get(self, request):
+        filters = search.SearchFilters.from_params(request.GET)
+        if filters.lat is None:
+            return JsonResponse({'error': 'lat and lng are required'}, status=400)
+        max_results = getattr(settings, 'SEARCH_MAX_PAGE_SIZE', 50)
+        try:
+            k = max(1, min(int(request.GET['k']), max_results)) if request.GET.get('k') else None
+        except ValueError:
+            k = None
+        radius = filters.radius if filters.radius and filters.radius > 0 else None
+        nearest = geo.nearby_vendors(filters.lat, filters.lng, radius_km=radius, k=k or (None if radius else max_results))
+        nearest = nearest[:max_results]
+        by_pk = VendorProfile.objects.in_bulk([pk for pk, _ in nearest])
+        return JsonResponse({'vendors': [
+            {
+                'id': pk,
+                'name': by_pk[pk].business_name,
+                'cuisine': by_pk[pk].cuisine,
+                'latitude': float(by_pk[pk].latitude),
+                'longitude': float(by_pk[pk].longitude),
+                'distance_km': round(distance, 3),
+                'url': reverse('vendor-detail', args=[pk]),
+            }
+            for pk, distance in nearest if pk in by_pk
+        ]})
+
+# Map markers for a viewport: ?south=&west=&north=&east=&zoom=. Clusters (count and centroid per
+# grid cell) from the precomputed MapCluster rows; individual vendors once zoomed in far enough
+class MapClustersView(View):
+    def get(self, request):
+        try:
+            south, west, north, east = (float(request.GET[k]) for k in ('south', 'west', 'north', 'east'))
+            zoom = max(0, min(int(request.GET.get('zoom', 0)), 22))
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'south, west, north, east and zoom are required'}, status=400)
+        if not all(map(math.isfinite, (south, west, north, east))) or south > north:
+            return JsonResponse({'error': 'invalid bounding box'}, status=400)
+
+        if zoom >= getattr(settings, 'MAP_MARKER_ZOOM', 16):
+            vendors = map_clusters.viewport_vendors(south, west, north, east)
+            return JsonResponse({'zoom': zoom, 'clusters': [], 'vendors': [
+                {
+                    'id': v.pk,
+                    'name': v.business_name,
+                    'latitude': float(v.latitude),
+                    'longitude': float(v.longitude),
+                    'url': reverse('vendor-detail', args=[v.pk]),
+                }
+                for v in vendors
+            ]})
+        precision, clusters = map_clusters.viewport_clusters(south, west, north, east, zoom)
+        return JsonResponse({'zoom': zoom, 'precision': precision, 'clusters': clusters, 'vendors': []})
+
 # Register view for new users
 class CustomLoginView(LoginView):
     template_name = 'registration/login.html'
@@ -322,10 +384,16 @@ class VendorDetailView(DetailView):
         context['food_items'] = FoodItem.objects.filter(vendor=vendor).order_by('name')
         context['reviews'] = vendor.reviews.select_related('user').order_by('-created_at')
 
-        # 🔹 Recommended vendors based on cuisine (excluding the current one)
-        context['similar_vendors'] = VendorProfile.objects.filter(
-            cuisine=vendor.cuisine
-        ).exclude(id=vendor.id).order_by('-average_rating')[:3]
+        # 🔹 Recommended vendors, precomputed by `manage.py compute_similar_vendors`
+        similar_vendors = list(
+            VendorProfile.objects.filter(similar_to__vendor=vendor).order_by('similar_to__rank')[:3]
+        )
+        if not similar_vendors:
+            # Vendor added since the last run: fall back to the same cuisine
+            similar_vendors = VendorProfile.objects.filter(
+                cuisine=vendor.cuisine
+            ).exclude(id=vendor.id).order_by('-average_rating')[:3]
+        context['similar_vendors'] = similar_vendors
 
         return context
     
@@ -380,6 +448,17 @@ class VendorDashboardView(LoginRequiredMixin, TemplateView):
         context['vendor'] = self.request.user.vendor_profile
         return context
     
+# Vendor analytics: bookings per day, confirmation rate, party sizes, peak hours and rating trend
+# for the last VENDOR_ANALYTICS_DAYS, computed from the vendor's daily rollups (core/analytics.py)
+class VendorAnalyticsView(LoginRequiredMixin, TemplateView):
+    template_name = 'vendors/analytics.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['vendor'] = self.request.user.vendor_profile
+        context['analytics'] = analytics.vendor_analytics(context['vendor'])
+        return context
+
 # Dashboard for Tourist
 class TouristDashboardView(LoginRequiredMixin, TemplateView):
     template_name = 'tourists/dashboard.html'
@@ -394,6 +473,13 @@ class TouristDashboardView(LoginRequiredMixin, TemplateView):
         # Add submitted reviews
         context['my_reviews'] = Review.objects.filter(user=self.request.user).select_related('vendor').order_by('-created_at')
 
+        # Recommended for you: item-item model trained by `manage.py train_recommender`
+        seen = Booking.objects.filter(tourist=user).values_list('vendor_id').union(
+            Review.objects.filter(user=user).values_list('vendor_id')
+        )
+        recommended_ids = recommendations.recommended_vendor_ids({pk for pk, in seen}, limit=4)
+        by_pk = VendorProfile.objects.in_bulk(recommended_ids)
+        context['recommended_vendors'] = [by_pk[pk] for pk in recommended_ids if pk in by_pk]
 
         return context
 
@@ -451,23 +537,33 @@ class TouristProfileUpdateView(LoginRequiredMixin, TemplateView):
         })
 
 # For Tourists – to see their own bookings (already exists):
-class TouristBookingListView(LoginRequiredMixin, ListView):
-    model = Booking
+# A tourist's bookings, newest date first, as keyset pages of one vendor-joined query over
+# core_booking_tourist_date_idx; each page is split into upcoming (soonest first) and past
+class TouristBookingListView(LoginRequiredMixin, TemplateView):
     template_name = 'bookings/my_bookings.html'
-    context_object_name = 'bookings'
+    PAST_ORDERING = [('booking_date', True, False), ('booking_time', True, False), ('pk', True, False)]
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        now = timezone.now().date()
-
-        context['upcoming_bookings'] = Booking.objects.filter(
-            tourist=self.request.user, booking_date__gte=now
-        ).order_by('booking_date')
-
-        context['past_bookings'] = Booking.objects.filter(
-            tourist=self.request.user, booking_date__lt=now
-        ).order_by('-booking_date')
+        today = timezone.localdate()
+        cursor = self.request.GET.get('cursor')
+        bookings = Booking.objects.filter(tourist=self.request.user).select_related('vendor')
+
+        # Upcoming bookings (soonest first, bounded) on the first page; the past history is paginated
+        upcoming = []
+        if not cursor:
+            limit = getattr(settings, 'TOURIST_UPCOMING_BOOKINGS_LIMIT', 50)
+            upcoming = list(bookings.filter(booking_date__gte=today)
+                            .order_by('booking_date', 'booking_time', 'pk')[:limit])
+        page_size = getattr(settings, 'TOURIST_BOOKINGS_PAGE_SIZE', 20)
+        past, next_cursor = KeysetPaginator(self.PAST_ORDERING, page_size).page(
+            bookings.filter(booking_date__lt=today), cursor
+        )
 
+        context['upcoming_bookings'] = upcoming
+        context['past_bookings'] = past
+        context['is_first_page'] = not cursor
+        context['next_page_url'] = f"{self.request.path}?cursor={next_cursor}" if next_cursor else None
         return context
 
 # Password Change for Tourist
@@ -484,6 +580,15 @@ class BookingUpdateView(LoginRequiredMixin, UpdateView):
     def get_queryset(self):
         return Booking.objects.filter(tourist=self.request.user)
 
+    def form_valid(self, form):
+        # Move the booking's seats to the new slot, or keep the old booking if that slot is full
+        try:
+            self.object = reservations.rebook(form.instance)
+        except reservations.SlotFull as full:
+            form.add_error(None, f"Sorry, only {full.remaining} seats are left at that time.")
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
+
 # Booking Creation
 class BookingCreateView(LoginRequiredMixin, CreateView):
     model = Booking
@@ -496,10 +601,30 @@ class BookingCreateView(LoginRequiredMixin, CreateView):
             return redirect('login')
         return super().dispatch(request, *args, **kwargs)
 
+    def post(self, request, *args, **kwargs):
+        # A resubmitted form (double click, network retry) gets the original result
+        key = reservations.clean_idempotency_key(request.POST.get('idempotency_key'))
+        if reservations.replayed_booking_id(request.user.pk, key):
+            return HttpResponseRedirect(self.get_success_url())
+        return super().post(request, *args, **kwargs)
+
     def form_valid(self, form):
         form.instance.tourist = self.request.user
         form.instance.vendor = get_object_or_404(VendorProfile, pk=self.kwargs['pk'])
-        return super().form_valid(form)
+        form.instance.idempotency_key = reservations.clean_idempotency_key(self.request.POST.get('idempotency_key'))
+        if settings.BOOKING_ASYNC_INTAKE:
+            # Queued for the process_booking_queue workers; the page polls the request's status
+            intake = booking_queue.enqueue(form.instance)
+            return render(self.request, 'bookings/booking_pending.html', {
+                'vendor': form.instance.vendor, 'intake': intake,
+            }, status=202)
+        # Takes the seats atomically; a full slot comes back as a form error instead of an overbooking
+        try:
+            self.object = reservations.reserve(form.instance)
+        except reservations.SlotFull as full:
+            form.add_error(None, f"Sorry, only {full.remaining} seats are left at that time.")
+            return self.form_invalid(form)
+        return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self):
         messages.success(self.request, "Booking successful!")
@@ -508,8 +633,53 @@ class BookingCreateView(LoginRequiredMixin, CreateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['vendor'] = get_object_or_404(VendorProfile, pk=self.kwargs['pk'])
+        # One key per rendered form; kept when the form is redisplayed with errors
+        context['idempotency_key'] = (
+            reservations.clean_idempotency_key(self.request.POST.get('idempotency_key')) or uuid.uuid4().hex
+        )
         return context
 
+# Status of a queued booking request (BOOKING_ASYNC_INTAKE); the token is the credential
+class BookingRequestStatusView(View):
+    def get(self, request, token):
+        intake = get_object_or_404(BookingRequest.objects.only('token', 'status', 'booking_id', 'error'), token=token)
+        return JsonResponse({
+            'token': str(intake.token),
+            'status': intake.status,
+            'booking_id': intake.booking_id,
+            'error': intake.error,
+        })
+
+# Remaining seats per slot for a vendor: ?start=YYYY-MM-DD&end=YYYY-MM-DD (default: the next 7 days)
+class VendorAvailabilityView(View):
+    def get(self, request, pk):
+        vendor = get_object_or_404(VendorProfile, pk=pk)
+        try:
+            start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else timezone.localdate()
+            end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else start + timedelta(days=6)
+        except ValueError:
+            return JsonResponse({'error': 'start and end must be YYYY-MM-DD'}, status=400)
+        max_days = getattr(settings, 'AVAILABILITY_MAX_DAYS', 31)
+        if end < start or (end - start).days >= max_days:
+            return JsonResponse({'error': f'the range must cover 1 to {max_days} days'}, status=400)
+
+        days = reservations.availability(vendor, start, end)
+        return JsonResponse({
+            'vendor': vendor.pk,
+            'slot_minutes': getattr(settings, 'BOOKING_SLOT_MINUTES', 30),
+            'days': [
+                {
+                    'date': day.isoformat(),
+                    'remaining': sum(remaining for _, _, remaining in slots),
+                    'slots': [
+                        {'time': start_time.strftime('%H:%M'), 'capacity': capacity, 'remaining': remaining}
+                        for start_time, capacity, remaining in slots
+                    ],
+                }
+                for day, slots in days
+            ],
+        })
+
 # Cancel a booking
 class BookingCancelView(LoginRequiredMixin, TemplateView):
     template_name = 'bookings/booking_cancel_confirm.html'
@@ -522,9 +692,7 @@ class BookingCancelView(LoginRequiredMixin, TemplateView):
 
     def post(self, request, *args, **kwargs):
         booking = get_object_or_404(Booking, pk=kwargs['pk'], tourist=request.user)
-        if booking.status == 'pending':
-            booking.status = 'cancelled'
-            booking.save()
+        if booking.status == 'pending' and reservations.set_status(booking, 'cancelled'):
             messages.success(request, f"Booking for {booking.vendor.business_name} has been cancelled.")
         else:
             messages.warning(request, "This booking cannot be cancelled.")
@@ -548,28 +716,47 @@ class ReviewCreateView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         form.instance.user = self.request.user
         form.instance.vendor = self.vendor
-        response = super().form_valid(form)
-    
-        # Update vendor's average rating
-        avg_rating = Review.objects.filter(vendor=self.vendor).aggregate(avg=Avg('rating'))['avg']
-        self.vendor.average_rating = avg_rating or 0.0
-        self.vendor.save()
-
-        return response
+        # The vendor's rating stats are updated incrementally by the Review post_save signal
+        return super().form_valid(form)
 
     def get_success_url(self):
         return reverse('vendor-detail', kwargs={'pk': self.vendor.pk})
 
 # For Vendors – to see incoming bookings for their business:
-class VendorBookingListView(LoginRequiredMixin, ListView):
-    model = Booking
+# Vendor inbox: one keyset page of one tab at a time, each tab read in index order
+#   pending / confirmed -- upcoming bookings in that status, soonest first (core_booking_vendor_inbox_idx)
+#   past                -- earlier bookings and cancelled/declined ones, most recent first: a backward
+#                          scan of core_booking_vendor_date_idx that stops once the page is full
+class VendorBookingListView(LoginRequiredMixin, TemplateView):
     template_name = 'vendors/booking_list.html'
-    context_object_name = 'bookings'
+    TABS = ('pending', 'confirmed', 'past')
 
-    def get_queryset(self):
-        return Booking.objects.filter(
-            vendor=self.request.user.vendor_profile
-        ).select_related('tourist').order_by('-booking_date')
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        tab = self.request.GET.get('tab')
+        if tab not in self.TABS:
+            tab = 'pending'
+        today = timezone.localdate()
+        bookings = Booking.objects.filter(vendor=self.request.user.vendor_profile).select_related(
+            'tourist__tourist_profile'
+        )
+        if tab == 'past':
+            bookings = bookings.filter(Q(booking_date__lt=today) | Q(status__in=['cancelled', 'declined']))
+            ordering = [('booking_date', True, False), ('booking_time', True, False), ('pk', True, False)]
+        else:
+            bookings = bookings.filter(status=tab, booking_date__gte=today)
+            ordering = [('booking_date', False, False), ('booking_time', False, False), ('pk', False, False)]
+
+        cursor = self.request.GET.get('cursor')
+        page_size = getattr(settings, 'VENDOR_INBOX_PAGE_SIZE', 25)
+        context['bookings'], next_cursor = KeysetPaginator(ordering, page_size).page(bookings, cursor)
+        context.update({
+            'tab': tab,
+            'tabs': self.TABS,
+            'is_first_page': not cursor,
+            'next_page_url': f"{self.request.path}?tab={tab}&cursor={next_cursor}" if next_cursor else None,
+        })
+        return context
 
 # For Vendors – to accept/decline individual bookings:
 class VendorBookingUpdateView(LoginRequiredMixin, View):
@@ -577,18 +764,84 @@ class VendorBookingUpdateView(LoginRequiredMixin, View):
         booking = get_object_or_404(Booking, pk=pk, vendor=request.user.vendor_profile)
         new_status = request.GET.get('status')
 
-        if new_status in ['confirmed', 'declined'] and booking.status == 'pending':
-            booking.status = new_status
-            booking.save()
+        if new_status in ['confirmed', 'declined'] and booking.status == 'pending' \
+                and reservations.set_status(booking, new_status):
             messages.success(request, f"Booking has been {new_status}.")
         else:
             messages.warning(request, "Invalid or duplicate action.")
 
         return redirect('vendor-booking-list')
-    
+
+# For Vendors – accept/decline many pending bookings at once. POST booking_ids (repeated) and
+# status from the booking list, or JSON {"booking_ids": [...], "status": ...} for per-id outcomes
+class VendorBookingBulkUpdateView(LoginRequiredMixin, View):
+    MAX_IDS = 500
+
+    def post(self, request):
+        vendor = get_object_or_404(VendorProfile, user=request.user)
+        wants_json = request.content_type == 'application/json'
+        if wants_json:
+            try:
+                data = json.loads(request.body or b'{}')
+            except ValueError:
+                return JsonResponse({"status": "error", "errors": "invalid JSON"}, status=400)
+            raw_ids, new_status = data.get('booking_ids'), data.get('status')
+        else:
+            raw_ids, new_status = request.POST.getlist('booking_ids'), request.POST.get('status')
+
+        try:
+            booking_ids = {int(pk) for pk in raw_ids or ()}
+        except (TypeError, ValueError):
+            booking_ids = None
+        if new_status not in ('confirmed', 'declined') or not booking_ids or len(booking_ids) > self.MAX_IDS:
+            if wants_json:
+                return JsonResponse({"status": "error", "errors": "invalid booking_ids or status"}, status=400)
+            messages.warning(request, "Select some bookings to accept or decline.")
+            return redirect('vendor-booking-list')
+
+        outcomes = reservations.bulk_set_status(vendor, booking_ids, new_status)
+        if wants_json:
+            return JsonResponse({"status": new_status, "results": {str(pk): outcome for pk, outcome in outcomes.items()}})
+        changed = sum(outcome == new_status for outcome in outcomes.values())
+        messages.success(request, f"{changed} booking(s) {new_status}.")
+        if changed < len(outcomes):
+            messages.warning(request, f"{len(outcomes) - changed} booking(s) were no longer pending.")
+        return redirect('vendor-booking-list')
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class TestBookingAPI(View):
+    # Load-test hook for core/booking_stress_test.py: real bookings through the capacity check,
+    # made as a shared "loadtest" tourist. Only available with DEBUG on.
     def post(self, request, vendor_id):
-        # simulate booking logic
-        return JsonResponse({"status": "success"}, status=200)
+        if not settings.DEBUG:
+            raise Http404
+        tourist, _ = User.objects.get_or_create(username='loadtest', defaults={'is_tourist': True})
+        key = reservations.clean_idempotency_key(request.headers.get('Idempotency-Key'))
+        replayed = reservations.replayed_booking_id(tourist.pk, key)
+        if replayed:
+            return JsonResponse({"status": "success", "booking_id": replayed, "replayed": True}, status=200)
+
+        vendor = get_object_or_404(VendorProfile, pk=vendor_id)
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({"status": "error", "errors": "invalid JSON"}, status=400)
+        form = BookingForm(data)
+        if not form.is_valid():
+            return JsonResponse({"status": "error", "errors": form.errors}, status=400)
+        form.instance.tourist = tourist
+        form.instance.vendor = vendor
+        form.instance.idempotency_key = key
+        if settings.BOOKING_ASYNC_INTAKE:
+            intake = booking_queue.enqueue(form.instance)
+            return JsonResponse({
+                "status": "queued",
+                "token": str(intake.token),
+                "status_url": reverse('booking-request-status', args=[intake.token]),
+            }, status=202)
+        try:
+            booking = reservations.reserve(form.instance)
+        except reservations.SlotFull as full:
+            return JsonResponse({"status": "full", "remaining": full.remaining}, status=409)
+        return JsonResponse({"status": "success", "booking_id": booking.pk}, status=200)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -50,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -155,3 +157,50 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 
 
+# Search
+SEARCH_MAX_RESULTS = 500  # cap on full-text matches considered per query (core/search.py)
+SEARCH_PAGE_SIZE = 20  # vendors per search results page (?page_size= may lower it)
+SEARCH_MAX_PAGE_SIZE = 50
+SEARCH_CACHE_TIMEOUT = 300  # seconds a cached search page may be served (core/search_cache.py)
+
+# Cache: per-process local memory by default; set REDIS_URL to share it between workers
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+AUTOCOMPLETE_MAX_AGE = 300  # seconds before a worker reloads its autocomplete index (core/autocomplete.py)
+FUZZY_MIN_SIMILARITY = 0.2  # trigram similarity a word needs to match in ?fuzzy=1 searches (core/fuzzy.py)
+FUZZY_MAX_CANDIDATES = 2000  # candidate words considered per query word
+NEARBY_DEFAULT_RADIUS_KM = 5  # radius for sort=distance / nearby lookups without ?radius= (core/geo.py)
+NEARBY_MAX_RADIUS_KM = 50  # upper bound for ?radius= and k-nearest expansion
+MAP_CLUSTER_MAX_PRECISION = 7  # finest geohash cell (~150m) with precomputed map clusters (core/map_clusters.py)
+MAP_MARKER_ZOOM = 16  # from this map zoom on, vendors/map/ returns individual markers
+MAP_MAX_MARKERS = 500
+SIMILAR_VENDORS_K = 6  # similar vendors stored per vendor by compute_similar_vendors (core/recommendations.py)
+SIMILAR_VENDORS_DISTANCE_KM = 5  # distance at which the proximity score falls to 1/e
+RECOMMENDER_MODEL_DIR = Path(os.getenv('RECOMMENDER_MODEL_DIR', BASE_DIR / 'var' / 'recommender'))  # train_recommender output
+RECOMMENDER_NEIGHBOURS = 20  # similar vendors kept per vendor in the model
+BOOKING_SLOT_MINUTES = 30  # bookings within the same slot share its seats (core/reservations.py)
+IDEMPOTENCY_CACHE_TIMEOUT = 600  # seconds a booking submission's idempotency key is answered from the cache
+BOOKING_OPENING_HOURS = ('10:00', '22:00')  # slots listed by the availability API
+AVAILABILITY_MAX_DAYS = 31
+VENDOR_INBOX_PAGE_SIZE = 25  # bookings per page of a vendor's booking list tab
+TOURIST_BOOKINGS_PAGE_SIZE = 20  # past bookings per page of a tourist's My Itinerary
+TOURIST_UPCOMING_BOOKINGS_LIMIT = 50  # upcoming bookings listed above them, soonest first
+
+# Admin dashboard (core/dashboard.py)
+ADMIN_DASHBOARD_FRESH_SECONDS = 60  # older figures are served while a background refresh runs
+ADMIN_DASHBOARD_MAX_STALE_SECONDS = 600  # older figures are recomputed in the request
+ADMIN_USERS_PAGE_SIZE = 50  # users per page of the admin user list
+VENDOR_ANALYTICS_DAYS = 365  # window of the vendor analytics charts (core/analytics.py)
+# Queue booking submissions for `manage.py process_booking_queue` workers instead of writing them in the request
+BOOKING_ASYNC_INTAKE = os.getenv('BOOKING_ASYNC_INTAKE', '') == '1'
+BOOKING_QUEUE_BATCH_SIZE = 100
+BOOKING_QUEUE_CLAIM_TIMEOUT = 300  # seconds before a batch claimed by a worker that died is retried
+BOOKING_QUEUE_MAX_ATTEMPTS = 3
+
+# Per-request SQL count and timings (core/instrumentation.py)
+REQUEST_METRICS_HEADER = True  # send them as a Server-Timing header
+REQUEST_METRICS_MAX_QUERIES = 50  # requests running more queries are logged as warnings
+REQUEST_METRICS_SLOW_MS = 500  # as are requests taking longer